@@ -0,0 +1,95 @@
+"""Whole-catalog export: streamed /courses/export vs paging GET /courses/ with skip/limit.
+
+Seeds --courses courses (plus enrollments for the roster variant) and reports
+wall time and peak Python memory (tracemalloc) of producing the full output
+each way. The streamed export's peak should not grow with the catalog size:
+
+    python -m benchmarks.catalog_export --courses 20000 100000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("catalog_export")
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from db.CRUD import get_all_courses  # noqa: E402
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course, Student, students_courses  # noqa: E402
+from db.session import SessionFactory  # noqa: E402
+from schemas.course import CourseResponse  # noqa: E402
+from utils.bulk_export import export_courses  # noqa: E402
+from utils.json_encoding import dumps  # noqa: E402
+
+FIELDS = list(CourseResponse.model_fields)
+STUDENTS = 200
+
+
+def seed(courses: int):
+    with engine.begin() as connection:
+        connection.execute(delete(students_courses))
+        connection.execute(delete(Course))
+        for start in range(0, courses, 10000):
+            connection.execute(insert(Course), [
+                {"field": f"Field {i % 40}", "subject": f"Subject number {i}", "instructor_name": f"Instructor {i % 97}",
+                 "no_of_registered_students": 0}
+                for i in range(start, min(start + 10000, courses))
+            ])
+        student_ids = list(connection.scalars(select(Student.id)))
+        course_ids = list(connection.scalars(select(Course.id)))
+        # Every tenth course gets a roster of five
+        connection.execute(insert(students_courses), [
+            {"student_id": student_ids[(course_id + k) % len(student_ids)], "course_id": course_id}
+            for course_id in course_ids[::10] for k in range(5)
+        ])
+
+
+def paged(page_size: int = 100):
+    # What the reporting jobs did: one OFFSET query and ORM page after another
+    skip = 0
+    with SessionFactory() as db:
+        while True:
+            page = get_all_courses(db, skip=skip, limit=page_size)
+            if not page:
+                return
+            yield dumps([{field: getattr(course, field) for field in FIELDS} for course in page])
+            skip += page_size
+            db.expunge_all()
+
+
+def measure(chunks) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in chunks)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "bytes": size, "peak_kib": round(peak / 1024)}
+
+
+def main(args):
+    init_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(Student), [
+            {"name": f"student{i}", "email": f"student{i}@example.com", "password": "x"} for i in range(STUDENTS)
+        ])
+    results = {}
+    for courses in args.courses:
+        seed(courses)
+        results[f"courses_{courses}"] = {
+            "paged_offset": measure(paged()),
+            "export_ndjson": measure(export_courses("ndjson", FIELDS)),
+            "export_csv": measure(export_courses("csv", FIELDS)),
+            "export_ndjson_with_students": measure(export_courses("ndjson", FIELDS, include_students=True)),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, nargs="+", default=[20000, 100000])
+    main(parser.parse_args())
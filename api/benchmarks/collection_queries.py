@@ -0,0 +1,97 @@
+"""Query counts and latency of the paginated collection endpoints.
+
+Seeds one student enrolled in every course and one course holding every
+student, then calls GET /students/me/courses and GET /courses/{id}/students
+with relationships in lazy="raise" mode. Exits non-zero if a request issues
+more than --max-queries statements or if the count grows with the page size:
+
+    python -m benchmarks.collection_queries --sizes 10 100 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from benchmarks.common import summarize, use_scratch_database
+
+use_scratch_database("collection_queries")
+os.environ.setdefault("DB_RELATIONSHIP_LAZY", "raise")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.exc import InvalidRequestError  # noqa: E402
+
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course, Student, students_courses  # noqa: E402
+from db.session import SessionFactory  # noqa: E402
+from main import app  # noqa: E402
+from utils.jwt_utils import create_access_token, user_claims  # noqa: E402
+from utils.query_counter import count_queries  # noqa: E402
+
+
+def seed(size: int):
+    with engine.begin() as connection:
+        connection.execute(insert(Student), [
+            {"name": f"student{i}", "email": f"student{i}@example.com", "password": "x"}
+            for i in range(size)
+        ])
+        connection.execute(insert(Course), [{"field": f"field{i}", "no_of_registered_students": 0} for i in range(size)])
+        student_ids = list(connection.scalars(select(Student.id).order_by(Student.id)))
+        course_ids = list(connection.scalars(select(Course.id).order_by(Course.id)))
+        rows = [{"student_id": student_ids[0], "course_id": course_id} for course_id in course_ids]
+        rows += [{"student_id": student_id, "course_id": course_ids[0]} for student_id in student_ids[1:]]
+        connection.execute(insert(students_courses), rows)
+    return student_ids[0], course_ids[0]
+
+
+def lazy_load_raises(student_id: int) -> bool:
+    with SessionFactory() as db:
+        student = db.get(Student, student_id)
+        try:
+            len(student.courses)
+        except InvalidRequestError:
+            return True
+    return False
+
+
+async def measure(client, url: str, page_size: int, repeat: int) -> dict:
+    await client.get(url, params={"limit": page_size})  # warm principal/course caches
+    samples, counts = [], set()
+    for _ in range(repeat):
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = await client.get(url, params={"limit": page_size})
+            samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        counts.add(counter.count)
+    return {"items": len(response.json()), "queries": max(counts), **summarize(samples)}
+
+
+async def run(args) -> int:
+    init_schema()
+    student_id, course_id = seed(max(args.sizes))
+    with SessionFactory() as db:
+        token = create_access_token(user_claims(db.get(Student, student_id)))
+
+    transport = httpx.ASGITransport(app=app)
+    report = {"lazy_mode": os.environ["DB_RELATIONSHIP_LAZY"], "lazy_load_raises": lazy_load_raises(student_id)}
+    failed = False
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"access_token": token}) as client:
+        for name, url in (("my_courses", "/students/me/courses"), ("course_students", f"/courses/{course_id}/students")):
+            results = {size: await measure(client, url, size, args.repeat) for size in args.sizes}
+            query_counts = {result["queries"] for result in results.values()}
+            if len(query_counts) > 1 or max(query_counts) > args.max_queries:
+                failed = True
+            report[name] = results
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-queries", type=int, default=2)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,38 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks are run from the api/ directory, e.g. ``python -m benchmarks.login_storm``.
+They use a throwaway SQLite database unless BENCH_DATABASE_URL is set.
+"""
+import os
+import statistics
+import tempfile
+
+
+def use_scratch_database(name: str) -> str:
+    """Point the app at a fresh benchmark database (must run before importing the app)"""
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        path = os.path.join(tempfile.mkdtemp(prefix="safeloan-bench-"), f"{name}.db")
+        url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-" + "0" * 48)
+    return url
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples) -> dict:
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
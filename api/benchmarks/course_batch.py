@@ -0,0 +1,103 @@
+"""N single GET /courses/{id} vs one GET /courses:batch?ids=... over ASGI.
+
+For each N, the singles run both one after another and --concurrency at a
+time (a browser opens about six connections per host). The report gives the wall time and
+SQL statements for each way. The course cache is off unless
+COURSE_CACHE_BACKEND is set, in which case every round is measured warm:
+
+    python -m benchmarks.course_batch --sizes 10 50 200
+    COURSE_CACHE_BACKEND=memory python -m benchmarks.course_batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("course_batch")
+# Every way should reach the database unless a cache is asked for
+os.environ.setdefault("COURSE_CACHE_BACKEND", "none")
+WARM = os.environ["COURSE_CACHE_BACKEND"] != "none"
+CONCURRENCY = 6
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course  # noqa: E402
+from main import app  # noqa: E402
+from utils.query_counter import count_queries  # noqa: E402
+
+
+async def sequential(client, ids):
+    for course_id in ids:
+        (await client.get(f"/courses/{course_id}")).raise_for_status()
+
+async def concurrent(client, ids):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def get(course_id):
+        async with semaphore:
+            (await client.get(f"/courses/{course_id}")).raise_for_status()
+
+    await asyncio.gather(*(get(course_id) for course_id in ids))
+
+async def batch(client, ids):
+    response = await client.get("/courses:batch", params={"ids": ",".join(map(str, ids))})
+    response.raise_for_status()
+    assert [course["id"] for course in response.json()["items"]] == ids
+
+
+async def run(sizes, rounds: int, total: int) -> dict:
+    rng = random.Random(1)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in sizes:
+            results[f"n_{size}"] = {}
+            for name, way in (("single_sequential", sequential), ("single_concurrent", concurrent), ("batch", batch)):
+                timings, queries = [], 0
+                for _ in range(rounds):
+                    ids = rng.sample(range(1, total + 1), size)
+                    if WARM:
+                        await batch(client, ids)  # warm the cache first
+                    with count_queries() as counter:
+                        started = time.perf_counter()
+                        await way(client, ids)
+                        timings.append(time.perf_counter() - started)
+                    queries += counter.count
+                results[f"n_{size}"][name] = {
+                    "ms": round(sorted(timings)[len(timings) // 2] * 1000, 2),
+                    "queries": queries // rounds,
+                }
+            results[f"n_{size}"]["speedup_vs_sequential"] = round(
+                results[f"n_{size}"]["single_sequential"]["ms"] / results[f"n_{size}"]["batch"]["ms"], 1
+            )
+    return results
+
+
+def main(args):
+    global CONCURRENCY
+    CONCURRENCY = args.concurrency
+    init_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(Course), [
+            {"field": f"Field {i % 40}", "subject": f"Subject number {i}", "instructor_name": f"Instructor {i % 97}",
+             "no_of_registered_students": 0}
+            for i in range(args.courses)
+        ])
+    report = {"course_cache": os.environ["COURSE_CACHE_BACKEND"],
+              **asyncio.run(run(args.sizes, args.rounds, args.courses))}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=6, help="single GETs in flight at once")
+    main(parser.parse_args())
@@ -0,0 +1,86 @@
+"""Concurrent enroll/unenroll stress check for the enrollment counter.
+
+Hammers one course from many threads with duplicate enrollments and random
+unenrollments, then verifies that courses.no_of_registered_students equals
+the number of students_courses rows. Exits non-zero on drift.
+
+    python -m benchmarks.enrollment_stress --students 200 --operations 2000 --threads 16
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("enrollment_stress")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from db.CRUD import create_course, enroll_student_in_course, unenroll_student_from_course  # noqa: E402
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course, Student, students_courses  # noqa: E402
+from db.session import SessionFactory  # noqa: E402
+
+
+def run_operations(course_id: int, student_ids: list, operations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    outcomes = {"enrolled": 0, "already_enrolled": 0, "unenrolled": 0, "not_enrolled": 0}
+    with SessionFactory() as db:
+        for _ in range(operations):
+            student_id = rng.choice(student_ids)
+            if rng.random() < 0.7:
+                result = enroll_student_in_course(db, student_id, course_id)
+                outcomes["enrolled" if result else "already_enrolled"] += 1
+            else:
+                result = unenroll_student_from_course(db, student_id, course_id)
+                outcomes["unenrolled" if result else "not_enrolled"] += 1
+    return outcomes
+
+
+def main(args):
+    init_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(Student), [
+            {"name": f"student{i}", "email": f"student{i}@example.com", "password": "x"}
+            for i in range(args.students)
+        ])
+    with SessionFactory() as db:
+        course_id = create_course(db, field="Stress").id
+        student_ids = list(db.scalars(select(Student.id)))
+
+    per_thread = args.operations // args.threads
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(
+            lambda seed: run_operations(course_id, student_ids, per_thread, seed),
+            range(args.threads)
+        ))
+    elapsed = time.perf_counter() - started
+
+    with SessionFactory() as db:
+        counter = db.scalar(select(Course.no_of_registered_students).where(Course.id == course_id))
+        rows = db.scalar(select(func.count()).select_from(students_courses).where(students_courses.c.course_id == course_id))
+
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+    report = {
+        "operations": per_thread * args.threads,
+        "threads": args.threads,
+        "ops_per_second": round(per_thread * args.threads / elapsed, 1),
+        "outcomes": totals,
+        "counter": counter,
+        "enrollment_rows": rows,
+        "exact": counter == rows == totals["enrolled"] - totals["unenrolled"],
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["exact"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Rows/sec of the course listing: ORM + CourseResponse validation vs row tuples + orjson.
+
+Measures the work behind GET /courses/ (query, materialization, encoding)
+without HTTP or the course cache:
+
+    python -m benchmarks.list_serialization --courses 5000 --limits 100 1000
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("list_serialization")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from db.CRUD import get_all_courses, get_course_rows  # noqa: E402
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course  # noqa: E402
+from db.session import SessionFactory  # noqa: E402
+from schemas.course import CourseResponse  # noqa: E402
+from utils.json_encoding import dumps, rows_to_dicts  # noqa: E402
+
+FIELDS = list(CourseResponse.model_fields)
+ORM_ADAPTER = TypeAdapter(List[CourseResponse])
+
+
+def orm_path(db, limit: int) -> bytes:
+    # What FastAPI does with response_model=List[CourseResponse]
+    courses = get_all_courses(db, skip=0, limit=limit)
+    return ORM_ADAPTER.dump_json(ORM_ADAPTER.validate_python(courses, from_attributes=True))
+
+
+def fast_path(db, limit: int) -> bytes:
+    return dumps(rows_to_dicts(FIELDS, get_course_rows(db, FIELDS, skip=0, limit=limit)))
+
+
+def measure(path, limit: int, seconds: float) -> dict:
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        with SessionFactory() as db:
+            path(db, limit)
+        calls += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": calls,
+        "ms_per_call": round(elapsed / calls * 1000, 3),
+        "rows_per_second": round(calls * limit / elapsed),
+    }
+
+
+def main(args):
+    init_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(Course), [
+            {"field": f"Field {i % 40}", "subject": f"Subject number {i}", "class_timing": "Mon 10:00",
+             "instructor_name": f"Instructor {i % 97}", "no_of_registered_students": i % 300}
+            for i in range(args.courses)
+        ])
+
+    with SessionFactory() as db:
+        assert json.loads(orm_path(db, 50)) == json.loads(fast_path(db, 50))
+
+    results = {}
+    for limit in args.limits:
+        orm = measure(orm_path, limit, args.seconds)
+        fast = measure(fast_path, limit, args.seconds)
+        results[f"limit_{limit}"] = {
+            "orm": orm,
+            "fast": fast,
+            "speedup": round(fast["rows_per_second"] / orm["rows_per_second"], 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    main(parser.parse_args())
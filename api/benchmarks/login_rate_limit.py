@@ -0,0 +1,86 @@
+"""Credential-stuffing check for the per-email login limit.
+
+Sends --attempts wrong-password logins for one account, each from a new
+client IP so only the per-email bucket applies, in three forms: a plain JSON
+body, one padded past the inspected size, and the padded one sent chunked
+(without Content-Length). Reports how many reached the route (401, a bcrypt
+verification each) per form. Exits non-zero when any form gets more than
+RATE_LIMIT_EMAIL_BURST through:
+
+    python -m benchmarks.login_rate_limit --attempts 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import Counter
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("login_rate_limit")
+# A new X-Forwarded-For address per attempt keeps the per-IP bucket out of the way
+os.environ["RATE_LIMIT_ENABLED"] = "true"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["RATE_LIMIT_TRUST_FORWARDED"] = "true"
+
+import httpx  # noqa: E402
+
+from db.init_db import init_schema  # noqa: E402
+from main import app  # noqa: E402
+from utils.rate_limit import MAX_INSPECTED_BODY, RATE_LIMIT_EMAIL_BURST  # noqa: E402
+
+PASSWORD = "correct horse"
+
+
+def login_body(email: str, padded: bool) -> bytes:
+    payload = {"email": email, "password": "wrong " + PASSWORD}
+    if padded:
+        payload["pad"] = "x" * (MAX_INSPECTED_BODY + 4096)
+    return json.dumps(payload).encode()
+
+
+async def chunks(body: bytes, size: int = 4096):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def attempt_logins(client, form: str, attempts: int) -> dict:
+    email = f"{form}@example.com"
+    response = await client.post("/auth/register", json={"email": email, "name": form, "password": PASSWORD},
+                                 headers={"x-forwarded-for": f"10.0.0.{len(form)}"})
+    response.raise_for_status()
+    statuses = Counter()
+    for i in range(attempts):
+        body = login_body(email, padded=form != "plain")
+        headers = {"content-type": "application/json", "x-forwarded-for": f"10.1.{i // 250}.{i % 250}"}
+        content = chunks(body) if form == "padded_chunked" else body
+        response = await client.post("/auth/login", content=content, headers=headers)
+        statuses[response.status_code] += 1
+    return {"statuses": dict(sorted(statuses.items())), "reached_route": statuses[401]}
+
+
+async def run(attempts: int) -> dict:
+    transport = httpx.ASGITransport(app=app, client=("10.255.0.1", 1))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return {form: await attempt_logins(client, form, attempts)
+                for form in ("plain", "padded", "padded_chunked")}
+
+
+def main(args):
+    init_schema()
+    results = asyncio.run(run(args.attempts))
+    report = {
+        "attempts": args.attempts,
+        "email_burst": RATE_LIMIT_EMAIL_BURST,
+        **results,
+        "limited": all(result["reached_route"] <= RATE_LIMIT_EMAIL_BURST for result in results.values()),
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["limited"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=30)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""p99 latency of GET /courses/ while a storm of logins is running.
+
+Compares the "inline" hashing mode (bcrypt on the event loop, the old
+behaviour) with the pooled executor:
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import summarize, use_scratch_database
+
+use_scratch_database("login_storm")
+# The storm comes from one client; measure hashing, not the rate limiter
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# The course requests should reach the database, not the course list cache
+os.environ.setdefault("COURSE_CACHE_BACKEND", "none")
+
+import httpx  # noqa: E402
+
+from db.init_db import init_schema  # noqa: E402
+from main import app  # noqa: E402
+from utils import hashing_pass  # noqa: E402
+
+CREDENTIALS = {"email": "storm@example.com", "name": "storm", "password": "correct horse"}
+
+
+async def _login_storm(client, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def one_login():
+        async with semaphore:
+            response = await client.post("/auth/login", json={
+                "email": CREDENTIALS["email"], "password": CREDENTIALS["password"]
+            })
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(one_login() for _ in range(total)))
+    return statuses
+
+
+async def _browse_until(client, done: asyncio.Event, samples: list):
+    while not done.is_set():
+        started = time.perf_counter()
+        await client.get("/courses/")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+
+async def run_mode(mode: str, logins: int, concurrency: int) -> dict:
+    hashing_pass.shutdown_hash_executor()
+    hashing_pass.HASH_EXECUTOR = mode
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        samples = []
+        done = asyncio.Event()
+        browser = asyncio.create_task(_browse_until(client, done, samples))
+        started = time.perf_counter()
+        statuses = await _login_storm(client, logins, concurrency)
+        elapsed = time.perf_counter() - started
+        done.set()
+        await browser
+    return {
+        "mode": mode,
+        "login_statuses": statuses,
+        "storm_seconds": round(elapsed, 3),
+        "courses_latency": summarize(samples),
+    }
+
+
+async def main(args):
+    init_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/register", json=CREDENTIALS)
+        for i in range(20):
+            await client.post("/courses/", params={"field": f"Field {i}"})
+
+    results = [await run_mode(mode, args.logins, args.concurrency) for mode in args.modes]
+    hashing_pass.shutdown_hash_executor()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread"])
+    asyncio.run(main(parser.parse_args()))
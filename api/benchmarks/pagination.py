@@ -0,0 +1,68 @@
+"""Page 1 vs page N latency of GET /courses/ in offset and cursor mode.
+
+    python -m benchmarks.pagination --courses 100000 --page 1000 --limit 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import summarize, use_scratch_database
+
+use_scratch_database("pagination")
+# Every repeat should reach the database, not the course list cache
+os.environ.setdefault("COURSE_CACHE_BACKEND", "none")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course  # noqa: E402
+from main import app  # noqa: E402
+from utils.pagination import encode_cursor  # noqa: E402
+
+
+def seed_courses(total: int, batch: int = 10000):
+    with engine.begin() as connection:
+        for start in range(0, total, batch):
+            connection.execute(insert(Course), [
+                {"field": f"Field {i % 50}", "subject": f"Subject {i}", "no_of_registered_students": 0}
+                for i in range(start, min(start + batch, total))
+            ])
+
+
+async def time_requests(client, params: dict, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get("/courses/", params=params)
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return summarize(samples)
+
+
+async def main(args):
+    init_schema()
+    seed_courses(args.courses)
+    # Seeded ids are 1..N, so the cursor for page p continues after id (p - 1) * limit
+    last_page_offset = (args.page - 1) * args.limit
+    cases = {
+        "offset_page_1": {"skip": 0, "limit": args.limit},
+        f"offset_page_{args.page}": {"skip": last_page_offset, "limit": args.limit},
+        "cursor_page_1": {"cursor": "", "limit": args.limit},
+        f"cursor_page_{args.page}": {"cursor": encode_cursor(last_page_offset), "limit": args.limit},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {name: await time_requests(client, params, args.repeat) for name, params in cases.items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
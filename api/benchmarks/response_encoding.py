@@ -0,0 +1,129 @@
+"""Encode time and bytes on the wire of GET /courses/ pages, per encoder and content coding.
+
+Encoders: the stdlib JSONResponse, orjson (the listing fast path), Pydantic's
+dump_json (FastAPI's response_model path) and Pydantic + orjson (what an
+ORJSONResponse default class would do to response_model routes). The orjson
+body is then compressed with each coding the middleware supports, and the same
+pages are fetched over ASGI to check what actually goes on the wire:
+
+    python -m benchmarks.response_encoding --courses 5000 --limits 100 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("response_encoding")
+
+import os  # noqa: E402
+
+# Every request should encode (and compress) its page, not replay a cached body
+os.environ.setdefault("COURSE_CACHE_BACKEND", "none")
+
+import httpx  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from db.CRUD import get_course_rows  # noqa: E402
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course  # noqa: E402
+from db.session import SessionFactory  # noqa: E402
+from main import app  # noqa: E402
+from schemas.course import CourseResponse  # noqa: E402
+from utils.compression import COMPRESSORS  # noqa: E402
+from utils.json_encoding import dumps, orjson, rows_to_dicts  # noqa: E402
+
+FIELDS = list(CourseResponse.model_fields)
+ADAPTER = TypeAdapter(List[CourseResponse])
+
+ENCODERS = {
+    "stdlib_json": lambda items: JSONResponse(items).body,
+    "orjson": dumps,
+    "pydantic_dump_json": lambda items: ADAPTER.dump_json(ADAPTER.validate_python(items)),
+    "pydantic_then_orjson": lambda items: dumps(ADAPTER.dump_python(ADAPTER.validate_python(items), mode="json")),
+}
+
+
+def timed(function, seconds: float) -> float:
+    """Mean milliseconds per call over roughly `seconds` of repeated calls"""
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        function()
+        calls += 1
+    return round((time.perf_counter() - started) / calls * 1000, 3)
+
+
+def compress(coding: str, body: bytes) -> bytes:
+    return COMPRESSORS[coding]().compress(body, final=True)
+
+
+async def fetch_over_asgi(limit: int, requests: int) -> dict:
+    wire = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for coding in ["identity", *COMPRESSORS]:
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = await client.get("/courses/", params={"limit": limit},
+                                            headers={"Accept-Encoding": coding})
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+            wire[coding] = {
+                "content_encoding": response.headers.get("content-encoding", "identity"),
+                "bytes": response.num_bytes_downloaded,
+                "ms_per_request": round(sum(latencies) / len(latencies) * 1000, 3),
+            }
+    return wire
+
+
+def main(args):
+    init_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(Course), [
+            {"field": f"Field {i % 40}", "subject": f"Subject number {i}", "class_timing": "Mon 10:00",
+             "instructor_name": f"Instructor {i % 97}", "no_of_registered_students": i % 300}
+            for i in range(args.courses)
+        ])
+
+    results = {"orjson_installed": orjson is not None, "codings": list(COMPRESSORS)}
+    for limit in args.limits:
+        with SessionFactory() as db:
+            items = rows_to_dicts(FIELDS, get_course_rows(db, FIELDS, skip=0, limit=limit))
+        bodies = {name: encoder(items) for name, encoder in ENCODERS.items()}
+        assert all(json.loads(body) == json.loads(bodies["orjson"]) for body in bodies.values())
+
+        body = bodies["orjson"]
+        results[f"limit_{limit}"] = {
+            "encode_ms": {
+                name: timed(lambda encoder=encoder: encoder(items), args.seconds)
+                for name, encoder in ENCODERS.items()
+            },
+            "compression": {
+                "identity": {"bytes": len(body)},
+                **{
+                    coding: {
+                        "bytes": len(compress(coding, body)),
+                        "ratio": round(len(body) / len(compress(coding, body)), 2),
+                        "compress_ms": timed(lambda coding=coding: compress(coding, body), args.seconds),
+                    }
+                    for coding in COMPRESSORS
+                },
+            },
+            "over_asgi": asyncio.run(fetch_over_asgi(limit, args.requests)),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="timing budget per encoder and coding")
+    parser.add_argument("--requests", type=int, default=50, help="ASGI requests per content coding")
+    main(parser.parse_args())
@@ -0,0 +1,107 @@
+"""Check that course filters and subject search are answered from indexes.
+
+Seeds courses, then runs EXPLAIN on every filter combination used by
+GET /courses/ and fails (exit status 1) if any plan scans the courses table:
+
+    python -m benchmarks.search_explain --courses 20000
+
+On PostgreSQL sequential scans are disabled for the session, so a remaining
+"Seq Scan on courses" means no usable index exists for that query.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("search_explain")
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course  # noqa: E402
+from db.search import apply_course_filters  # noqa: E402
+
+FIELDS = ("biology", "mathematics", "physics", "chemistry", "history")
+WORDS = ("introduction", "advanced", "algebra", "genetics", "quantum", "organic", "modern", "ancient", "cell", "theory")
+
+CASES = {
+    "field": {"field": "physics"},
+    "instructor": {"instructor_name": "instructor-7"},
+    "field+instructor": {"field": "physics", "instructor_name": "instructor-7"},
+    "search": {"search": "quantum"},
+    "search+field": {"search": "genetics", "field": "chemistry"},
+}
+FULL_SCAN = {
+    "sqlite": re.compile(r"\bSCAN courses\b"),
+    "postgresql": re.compile(r"Seq Scan on courses\b"),
+}
+
+
+def seed(count: int):
+    rows = [
+        {
+            "field": FIELDS[i % len(FIELDS)],
+            "subject": f"{WORDS[i % len(WORDS)]} {WORDS[(i * 7) % len(WORDS)]} course {i}",
+            "instructor_name": f"instructor-{i % 50}",
+            "no_of_registered_students": 0,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(Course), rows)
+
+
+def listing_query(dialect: str, filters: dict):
+    # Same statement shape as CRUD.get_course_rows
+    query = select(Course.id, Course.field, Course.subject, Course.instructor_name)
+    return apply_course_filters(query, dialect, **filters).order_by(Course.id).limit(100)
+
+
+def explain(connection, dialect: str, query) -> str:
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).all()
+        return "\n".join(row[-1] for row in rows)
+    return "\n".join(row[0] for row in connection.exec_driver_sql("EXPLAIN " + sql).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20000)
+    args = parser.parse_args()
+
+    init_schema()
+    seed(args.courses)
+    dialect = engine.dialect.name
+    full_scan = FULL_SCAN.get(dialect)
+    if full_scan is None:
+        print(f"No index-backed search for dialect {dialect}", file=sys.stderr)
+        sys.exit(1)
+
+    report, failures = {}, []
+    with engine.connect() as connection:
+        if dialect == "postgresql":
+            connection.exec_driver_sql("ANALYZE courses")
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        for name, filters in CASES.items():
+            query = listing_query(dialect, filters)
+            plan = explain(connection, dialect, query)
+            started = time.perf_counter()
+            matches = len(connection.execute(query).all())
+            elapsed = time.perf_counter() - started
+            scans = bool(full_scan.search(plan))
+            if scans:
+                failures.append(name)
+            report[name] = {"rows": matches, "ms": round(elapsed * 1000, 3), "full_scan": scans, "plan": plan.splitlines()}
+
+    print(json.dumps({"dialect": dialect, "courses": args.courses, "cases": report}, indent=2))
+    if failures:
+        print(f"Full table scan in: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
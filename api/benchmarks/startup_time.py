@@ -0,0 +1,92 @@
+"""Worker startup time: importing main, building the app and running the lifespan startup.
+
+Each sample is a fresh interpreter, as a newly spawned worker would be. The
+slowest imports come from `python -X importtime`. The exit status is 1 when the
+median import + create_app time is over --budget-ms, so this can gate CI:
+
+    python -m benchmarks.startup_time --runs 10 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import use_scratch_database
+
+use_scratch_database("startup_time")
+
+from db.init_db import init_schema  # noqa: E402
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter and prints its timings (seconds) as JSON
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+ready = asyncio.run(startup())
+print(json.dumps({"import": imported - started, "create_app": created - imported, "lifespan": ready - created}))
+"""
+
+
+def run_probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=API_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int, max_depth: int) -> list:
+    """Modules imported by main and create_app (up to max_depth levels down) by cumulative import time"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main; main.create_app()"],
+        cwd=API_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= max_depth:
+            modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "ms": round(micros / 1000, 1)} for micros, name in modules[:top]]
+
+
+def main(args):
+    init_schema()
+    samples = [run_probe() for _ in range(args.runs)]
+    phases = {
+        phase: round(statistics.median(sample[phase] for sample in samples) * 1000, 1)
+        for phase in ("import", "create_app", "lifespan")
+    }
+    to_app = phases["import"] + phases["create_app"]
+    report = {
+        "runs": args.runs,
+        "median_ms": phases,
+        "import_and_create_app_ms": round(to_app, 1),
+        "budget_ms": args.budget_ms,
+        "within_budget": to_app <= args.budget_ms,
+        "slowest_imports": slowest_imports(args.top, args.depth),
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--depth", type=int, default=1, help="import nesting levels to include in that list")
+    sys.exit(main(parser.parse_args()))
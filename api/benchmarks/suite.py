@@ -0,0 +1,264 @@
+"""Mixed-workload load test of the whole API, driven in-process over ASGI.
+
+Seeds students, courses and enrollments, then runs a weighted mix of catalog
+browsing, course detail, login, enrollment and picture upload from
+--concurrency clients. Prints (or writes) a JSON report with req/s, error
+counts and p50/p95/p99 per route, to be compared between commits:
+
+    python -m benchmarks.suite --requests 5000 --output before.json
+    python -m benchmarks.suite --requests 5000 --compare before.json
+
+Set BENCH_DATABASE_URL to run against PostgreSQL instead of a scratch SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from benchmarks.common import summarize, use_scratch_database
+
+use_scratch_database("suite")
+# A single benchmark client would otherwise trip the login rate limit, and
+# uploads should not fill the upload directory
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+# The ASGI transport waits for background tasks, which would charge thumbnail
+# rendering to the upload request; set IMAGE_VARIANT_WIDTHS to include it
+os.environ.setdefault("IMAGE_VARIANT_WIDTHS", "")
+
+import httpx  # noqa: E402
+from sqlalchemy import bindparam, insert, select, update  # noqa: E402
+
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Course, Student, students_courses  # noqa: E402
+from main import app  # noqa: E402
+from utils.hashing_pass import hash_password  # noqa: E402
+from utils.jwt_utils import create_access_token, user_claims  # noqa: E402
+
+PASSWORD = "benchmark password"
+DEFAULT_MIX = "browse=50,detail=30,login=5,enroll=10,upload=5"
+PICTURE = Path(__file__).resolve().parents[2] / "assets" / "biology.jpg"
+FIELDS = ("Biology", "Mathematics", "Physics", "Chemistry", "History")
+
+
+def seed(students: int, courses: int, enrollments: int, rng: random.Random, batch: int = 5000):
+    password = hash_password(PASSWORD)  # one bcrypt hash shared by every student
+    courses_table = Course.__table__
+    with engine.begin() as connection:
+        for start in range(0, students, batch):
+            connection.execute(insert(Student), [
+                {"name": f"student{i}", "email": f"student{i}@example.com", "password": password}
+                for i in range(start, min(start + batch, students))
+            ])
+        for start in range(0, courses, batch):
+            connection.execute(insert(Course), [
+                {
+                    "field": FIELDS[i % len(FIELDS)],
+                    "subject": f"Course {i}",
+                    "instructor_name": f"Instructor {i % 40}",
+                    "no_of_registered_students": 0,
+                }
+                for i in range(start, min(start + batch, courses))
+            ])
+        student_rows = connection.execute(select(Student.id, Student.email, Student.name)).all()
+        course_ids = list(connection.scalars(select(Course.id)))
+
+        pairs = set()
+        target = min(enrollments, len(student_rows) * len(course_ids))
+        while len(pairs) < target:
+            pairs.add((rng.choice(student_rows).id, rng.choice(course_ids)))
+        rows = [{"student_id": student_id, "course_id": course_id} for student_id, course_id in pairs]
+        for start in range(0, len(rows), batch):
+            connection.execute(insert(students_courses), rows[start:start + batch])
+
+        counts = Counter(course_id for _, course_id in pairs)
+        if counts:
+            connection.execute(
+                update(courses_table)
+                .where(courses_table.c.id == bindparam("course_id"))
+                .values(no_of_registered_students=bindparam("registered")),
+                [{"course_id": course_id, "registered": count} for course_id, count in counts.items()]
+            )
+    return student_rows, course_ids
+
+
+class Workload:
+    """The operations of the mix; each returns (route label, response)"""
+
+    def __init__(self, client, students, course_ids, rng: random.Random, page_size: int):
+        self.client = client
+        self.students = students
+        self.course_ids = course_ids
+        self.rng = rng
+        self.page_size = page_size
+        self.picture = PICTURE.read_bytes()
+        # Enrollment uses pre-issued tokens, so only the login operation pays for bcrypt
+        self.tokens = {}
+
+    def _token(self, student) -> str:
+        if student.id not in self.tokens:
+            self.tokens[student.id] = create_access_token(user_claims(student))
+        return self.tokens[student.id]
+
+    async def browse(self):
+        pages = max(1, len(self.course_ids) // self.page_size)
+        skip = self.rng.randrange(pages) * self.page_size
+        return "GET /courses/", await self.client.get("/courses/", params={"skip": skip, "limit": self.page_size})
+
+    async def detail(self):
+        course_id = self.rng.choice(self.course_ids)
+        return "GET /courses/{course_id}", await self.client.get(f"/courses/{course_id}")
+
+    async def login(self):
+        student = self.rng.choice(self.students)
+        return "POST /auth/login", await self.client.post(
+            "/auth/login", json={"email": student.email, "password": PASSWORD}
+        )
+
+    async def enroll(self):
+        student = self.rng.choice(self.students)
+        course_id = self.rng.choice(self.course_ids)
+        return "POST /courses/{course_id}/enroll", await self.client.post(
+            f"/courses/{course_id}/enroll", cookies={"access_token": self._token(student)}
+        )
+
+    async def upload(self):
+        # Trailing bytes give every upload its own content hash (JPEG ignores them)
+        picture = self.picture + self.rng.randbytes(16)
+        return "POST /courses/", await self.client.post(
+            "/courses/",
+            params={"field": self.rng.choice(FIELDS), "subject": "Uploaded course"},
+            files={"course_pic": ("picture.jpg", picture, "image/jpeg")},
+        )
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"browse", "detail", "login", "enroll", "upload"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+async def drive(args, students, course_ids) -> dict:
+    rng = random.Random(args.seed)
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    operations = list(args.mix)
+    weights = [args.mix[name] for name in operations]
+    plan = rng.choices(operations, weights=weights, k=args.requests)
+    next_index = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        workload = Workload(client, students, course_ids, random.Random(args.seed + 1), args.page_size)
+
+        async def worker():
+            nonlocal next_index
+            while next_index < len(plan):
+                operation = plan[next_index]
+                next_index += 1
+                started = time.perf_counter()
+                route, response = await getattr(workload, operation)()
+                samples[route].append(time.perf_counter() - started)
+                statuses[route][response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route in sorted(samples):
+        errors = sum(count for status, count in statuses[route].items() if status >= 400)
+        routes[route] = {
+            "requests_per_second": round(len(samples[route]) / elapsed, 1),
+            "errors": errors,
+            "statuses": {str(status): count for status, count in sorted(statuses[route].items())},
+            **summarize(samples[route]),
+        }
+    total = sum(len(route_samples) for route_samples in samples.values())
+    return {
+        "total": {
+            "requests": total,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(total / elapsed, 1),
+            **summarize([sample for route_samples in samples.values() for sample in route_samples]),
+        },
+        "routes": routes,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Per-route ratios against a previous report (>1 means more throughput / higher latency)"""
+    deltas = {}
+    for route, current in report["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        deltas[route] = {
+            key: round(current[key] / previous[key], 3) if previous[key] else None
+            for key in ("requests_per_second", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return deltas
+
+
+def main(args):
+    init_schema()
+    rng = random.Random(args.seed)
+    students, course_ids = seed(args.students, args.courses, args.enrollments, rng)
+    report = {
+        "revision": git_revision(),
+        "database": engine.dialect.name,
+        "config": {
+            "students": args.students,
+            "courses": args.courses,
+            "enrollments": args.enrollments,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        **asyncio.run(drive(args, students, course_ids)),
+    }
+    if args.compare:
+        with open(args.compare) as source:
+            report["compared_to"] = {"file": args.compare, "ratios": compare(report, json.load(source))}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--enrollments", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="previous report to compute per-route ratios against")
+    main(parser.parse_args())
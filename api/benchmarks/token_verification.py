@@ -0,0 +1,84 @@
+"""Auth overhead per request with and without the verified-token cache.
+
+Measures verify_access_token on its own and GET /students/me/courses end to
+end, with the cache enabled and with a NullCache in its place:
+
+    python -m benchmarks.token_verification --tokens 100 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import summarize, use_scratch_database
+
+use_scratch_database("token_verification")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from db.init_db import engine, init_schema  # noqa: E402
+from db.models import Student  # noqa: E402
+from main import app  # noqa: E402
+from utils import jwt_utils  # noqa: E402
+from utils.cache import NullCache, TTLLRUCache  # noqa: E402
+
+
+def issue_tokens(count: int) -> list:
+    with engine.begin() as connection:
+        connection.execute(insert(Student), [
+            {"name": f"student{i}", "email": f"student{i}@example.com", "password": "x"}
+            for i in range(count)
+        ])
+        students = connection.execute(select(Student.id, Student.email, Student.name)).all()
+    return [jwt_utils.create_access_token({"sub": email, "uid": id, "name": name}) for id, email, name in students]
+
+
+def verify_loop(tokens: list, calls: int) -> dict:
+    rng = random.Random(0)
+    samples = []
+    for _ in range(calls):
+        token = rng.choice(tokens)
+        started = time.perf_counter()
+        jwt_utils.verify_access_token(token)
+        samples.append(time.perf_counter() - started)
+    return {**summarize(samples), "mean_us": round(sum(samples) / len(samples) * 1e6, 2)}
+
+
+async def request_loop(tokens: list, requests: int) -> dict:
+    rng = random.Random(1)
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for token in tokens:  # warm the principal cache, so only token checks differ
+            await client.get("/students/me/courses", cookies={"access_token": token})
+        for _ in range(requests):
+            client.cookies.set("access_token", rng.choice(tokens))
+            started = time.perf_counter()
+            response = await client.get("/students/me/courses")
+            samples.append(time.perf_counter() - started)
+            response.raise_for_status()
+    return summarize(samples)
+
+
+def main(args):
+    init_schema()
+    tokens = issue_tokens(args.tokens)
+    report = {"tokens": args.tokens}
+    for mode, cache in (("uncached", NullCache()), ("cached", TTLLRUCache(maxsize=max(args.tokens, 1), ttl=None))):
+        jwt_utils.verified_tokens = cache
+        report[mode] = {
+            "verify": verify_loop(tokens, args.calls),
+            "request": asyncio.run(request_loop(tokens, args.requests)),
+            "cache": cache.info(),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    main(parser.parse_args())
@@ -1,7 +1,19 @@
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
-from db.models import Student, Course
+from db.course_cache import invalidate_course, invalidate_course_lists
+from db.models import Student, Course, RevokedToken, students_courses
+from db.reconcile import mark_course_dirty
+from db.search import apply_course_filters
+
+# Rows per executemany round-trip for bulk operations
+BULK_CHUNK_SIZE = 1000
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
 
 # Student CRUD Operations
 def create_student(db: Session, name: str, email: str, password: str):
@@ -33,15 +45,39 @@ def get_student_by_email(db: Session, email: str):
 #         db.refresh(db_student)
 #     return db_student
 
+# Deletes remove enrollment rows with one statement instead of loading the
+# collection (relationships are passive_deletes; older schemas lack ON DELETE CASCADE)
 def delete_student(db: Session, student_id: int):
     db_student = db.query(Student).filter(Student.id == student_id).first()
     if db_student:
+        # The courses lose one registered student each, in the same transaction
+        enrollments = delete(students_courses).where(students_courses.c.student_id == student_id)
+        if db.get_bind().dialect.delete_returning:
+            course_ids = list(db.scalars(enrollments.returning(students_courses.c.course_id)))
+        else:
+            course_ids = list(db.scalars(
+                select(students_courses.c.course_id)
+                .where(students_courses.c.student_id == student_id)
+                .with_for_update()
+            ))
+            db.execute(enrollments)
+        if course_ids:
+            db.execute(
+                update(Course)
+                .where(Course.id.in_(course_ids))
+                .values(no_of_registered_students=func.coalesce(Course.no_of_registered_students, 0) - 1)
+                .execution_options(synchronize_session=False)
+            )
         db.delete(db_student)
         db.commit()
+        if course_ids:
+            invalidate_course(*course_ids)
         return True
     return False
 
 # Course CRUD Operations
+# Every course write invalidates the course cache (db/course_cache.py) right
+# after its commit, whichever layer called it
 def create_course(db: Session, field: str, subject: Optional[str] = None, 
                  class_timing: Optional[str] = None, instructor_name: Optional[str] = None, course_pic: Optional[str] = None):
     db_course = Course(
@@ -54,14 +90,107 @@ def create_course(db: Session, field: str, subject: Optional[str] = None,
     )
     db.add(db_course)
     db.commit()
+    invalidate_course_lists()
     db.refresh(db_course)
     return db_course
 
+def bulk_create_courses(db: Session, rows: List[dict]) -> Tuple[int, List[Tuple[int, str]]]:
+    """Insert course rows with one executemany per chunk.
+
+    Returns the number of inserted rows and (position, error) pairs. A chunk the
+    database rejects is retried row by row so only the offending rows fail.
+    """
+    inserted = 0
+    failures = []
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        try:
+            db.execute(insert(Course), chunk)
+            db.commit()
+            inserted += len(chunk)
+            continue
+        except (DataError, IntegrityError):
+            db.rollback()
+        for position, row in enumerate(chunk, start):
+            try:
+                db.execute(insert(Course), [row])
+                db.commit()
+                inserted += 1
+            except (DataError, IntegrityError) as e:
+                db.rollback()
+                failures.append((position, str(e.orig)))
+    if inserted:
+        invalidate_course_lists()
+    return inserted, failures
+
 def get_course(db: Session, course_id: int):
     return db.query(Course).filter(Course.id == course_id).first()
 
-def get_all_courses(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Course).offset(skip).limit(limit).all()
+def get_courses_by_ids(db: Session, course_ids: List[int]) -> List[dict]:
+    """Column dicts (the course cache's format) of the courses that exist among
+    course_ids, in no particular order; one IN query per BULK_CHUNK_SIZE ids"""
+    courses = Course.__table__
+    found = []
+    for start in range(0, len(course_ids), BULK_CHUNK_SIZE):
+        chunk = course_ids[start:start + BULK_CHUNK_SIZE]
+        found.extend(dict(row._mapping) for row in db.execute(select(courses).where(courses.c.id.in_(chunk))))
+    return found
+
+# Listing functions accept optional filters: field and instructor_name equality
+# and full-text `search` over subject (results then ordered by relevance)
+def get_all_courses(db: Session, skip: int = 0, limit: int = 100, **filters):
+    query = apply_course_filters(db.query(Course), _dialect(db), **filters)
+    return query.order_by(Course.id).offset(skip).limit(limit).all()
+
+# Keyset pagination: seeks straight to the primary key instead of scanning `skip` rows
+def get_courses_after(db: Session, after_id: Optional[int] = None, limit: int = 100, **filters):
+    query = apply_course_filters(db.query(Course), _dialect(db), **filters)
+    if after_id is not None:
+        query = query.filter(Course.id > after_id)
+    return query.order_by(Course.id).limit(limit).all()
+
+# ORM-free listing: plain row tuples of the requested columns, no identity map
+def get_course_rows(db: Session, columns: List[str], skip: int = 0, limit: int = 100,
+                    after_id: Optional[int] = None, **filters):
+    query = select(*(getattr(Course, column) for column in columns))
+    query = apply_course_filters(query, _dialect(db), **filters).order_by(Course.id)
+    if after_id is not None:
+        query = query.where(Course.id > after_id)
+    else:
+        query = query.offset(skip)
+    return [tuple(row) for row in db.execute(query.limit(limit))]
+
+def iter_course_export_batches(db: Session, columns: List[str], include_students: bool = False,
+                               batch_size: int = 1000, **filters) -> Iterator[list]:
+    """Rows of the requested columns in id order, batch_size at a time through a
+    server-side cursor where the driver has one (stream_results).
+
+    With include_students each row ends with (student id, student name), one row
+    per enrollment; a course without students gets a single row ending in Nones.
+    """
+    query = select(*(getattr(Course, column) for column in columns))
+    order = [Course.id]
+    if include_students:
+        query = (
+            query.add_columns(Student.id, Student.name)
+            .outerjoin(students_courses, students_courses.c.course_id == Course.id)
+            .outerjoin(Student, Student.id == students_courses.c.student_id)
+        )
+        order.append(Student.id)
+    query = apply_course_filters(query, _dialect(db), **filters).order_by(*order)
+    result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for rows in result.partitions():
+        yield [tuple(row) for row in rows]
+
+def count_courses(db: Session, **filters):
+    query = apply_course_filters(db.query(func.count(Course.id)), _dialect(db), **filters)
+    # Relevance ordering is meaningless (and invalid on PostgreSQL) for an aggregate
+    return query.order_by(None).scalar()
+
+def get_catalog_version(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Course count and latest updated_at: together they change on every insert, update and delete"""
+    count, latest = db.execute(select(func.count(Course.id), func.max(Course.updated_at))).one()
+    return count, latest
 
 def update_course(db: Session, course_id: int, **kwargs):
     db_course = db.query(Course).filter(Course.id == course_id).first()
@@ -69,36 +198,167 @@ def update_course(db: Session, course_id: int, **kwargs):
         for key, value in kwargs.items():
             setattr(db_course, key, value)
         db.commit()
+        invalidate_course(course_id)
+        if "no_of_registered_students" in kwargs:
+            # A hand-set counter is corrected by the next reconciliation pass
+            mark_course_dirty(course_id)
         db.refresh(db_course)
     return db_course
 
 def delete_course(db: Session, course_id: int):
     db_course = db.query(Course).filter(Course.id == course_id).first()
     if db_course:
+        db.execute(delete(students_courses).where(students_courses.c.course_id == course_id))
         db.delete(db_course)
         db.commit()
+        invalidate_course(course_id)
         return True
     return False
 
 # Student-Course Relationship Operations
-def enroll_student_in_course(db: Session, student_id: int, course_id: int):
-    student = get_student(db, student_id)
-    course = get_course(db, course_id)
-    
-    if student and course:
-        student.courses.append(course)
-        course.no_of_registered_students += 1
+# Enrollment never loads the student or course: the students_courses primary
+# key makes the insert idempotent and the counter moves with an SQL-side
+# expression in the same transaction, so concurrent requests cannot lose updates.
+def _insert_ignoring_conflicts(db: Session, table):
+    dialect = _dialect(db)
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+def _shift_registered_students(db: Session, course_id: int, delta: int):
+    return db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(no_of_registered_students=func.coalesce(Course.no_of_registered_students, 0) + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+def enroll_student_in_course(db: Session, student_id: int, course_id: int) -> Optional[bool]:
+    """True when enrolled, False when already enrolled, None when the student or course does not exist"""
+    try:
+        inserted = db.execute(
+            _insert_ignoring_conflicts(db, students_courses).values(student_id=student_id, course_id=course_id)
+        )
+        if inserted.rowcount == 0:
+            db.rollback()
+            return False
+        if _shift_registered_students(db, course_id, 1).rowcount == 0:
+            db.rollback()
+            return None
         db.commit()
+        invalidate_course(course_id)
         return True
-    return False
+    except IntegrityError:
+        # Unknown student/course (foreign key) or, without ON CONFLICT support, a duplicate row
+        db.rollback()
+        return None if get_student(db, student_id) is None or get_course(db, course_id) is None else False
 
-def unenroll_student_from_course(db: Session, student_id: int, course_id: int):
-    student = get_student(db, student_id)
-    course = get_course(db, course_id)
-    
-    if student and course and course in student.courses:
-        student.courses.remove(course)
-        course.no_of_registered_students -= 1
+def unenroll_student_from_course(db: Session, student_id: int, course_id: int) -> bool:
+    deleted = db.execute(
+        delete(students_courses).where(
+            students_courses.c.student_id == student_id,
+            students_courses.c.course_id == course_id
+        )
+    )
+    if deleted.rowcount == 0:
+        db.rollback()
+        return False
+    _shift_registered_students(db, course_id, -1)
+    db.commit()
+    invalidate_course(course_id)
+    return True
+
+
+def bulk_enroll_students(db: Session, course_id: int, student_ids: List[int]) -> Optional[dict]:
+    """Enroll many students in one course; None when the course does not exist.
+
+    Unknown students are reported instead of failing the batch, duplicates are
+    skipped by ON CONFLICT and the counter moves once by the number of new rows.
+    """
+    if db.scalar(select(Course.id).where(Course.id == course_id)) is None:
+        return None
+
+    unique_ids = list(dict.fromkeys(student_ids))
+    missing = []
+    enrolled = 0
+    for start in range(0, len(unique_ids), BULK_CHUNK_SIZE):
+        chunk = unique_ids[start:start + BULK_CHUNK_SIZE]
+        existing = set(db.scalars(select(Student.id).where(Student.id.in_(chunk))))
+        missing.extend(student_id for student_id in chunk if student_id not in existing)
+        params = [{"student_id": student_id, "course_id": course_id} for student_id in chunk if student_id in existing]
+        if params:
+            # RETURNING only yields rows that were actually inserted
+            enrolled += len(db.execute(
+                _insert_ignoring_conflicts(db, students_courses).returning(students_courses.c.student_id),
+                params
+            ).all())
+
+    if enrolled:
+        _shift_registered_students(db, course_id, enrolled)
+    db.commit()
+    if enrolled:
+        invalidate_course(course_id)
+    return {
+        "enrolled": enrolled,
+        "already_enrolled": len(unique_ids) - len(missing) - enrolled,
+        "missing_student_ids": missing,
+    }
+
+# Paginated collections: one query per page through the association table,
+# never touching Student.courses / Course.students (which load whole rosters)
+def get_student_courses(db: Session, student_id: int, skip: int = 0, limit: int = 100):
+    return (
+        db.query(Course)
+        .join(students_courses, students_courses.c.course_id == Course.id)
+        .filter(students_courses.c.student_id == student_id)
+        .order_by(Course.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+def get_course_students(db: Session, course_id: int, skip: int = 0, limit: int = 100):
+    return (
+        db.query(Student)
+        .join(students_courses, students_courses.c.student_id == Student.id)
+        .filter(students_courses.c.course_id == course_id)
+        .order_by(Student.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+# Token revocation
+def revoke_token_id(db: Session, token_id: str, expires_at: int, revoked_at: int,
+                    consumed: bool = False) -> bool:
+    """Record a revoked jti/sid; False when it was already revoked (atomic, so it
+    doubles as a one-time "consume" for refresh tokens, with consumed=True)"""
+    try:
+        inserted = db.execute(
+            _insert_ignoring_conflicts(db, RevokedToken.__table__)
+            .values(token_id=token_id, expires_at=expires_at, revoked_at=revoked_at, consumed=consumed)
+        )
         db.commit()
-        return True
-    return False
\ No newline at end of file
+        return inserted.rowcount == 1
+    except IntegrityError:
+        db.rollback()
+        return False
+
+def get_revocation(db: Session, token_id: str):
+    return db.get(RevokedToken, token_id)
+
+def get_revocations_since(db: Session, revoked_since: int, now: int) -> List[Tuple[str, int]]:
+    """(token_id, expires_at) of unexpired revocations recorded at or after revoked_since,
+    leaving out consumed refresh tokens"""
+    return [tuple(row) for row in db.execute(
+        select(RevokedToken.token_id, RevokedToken.expires_at)
+        .where(RevokedToken.revoked_at >= revoked_since, RevokedToken.expires_at > now,
+               RevokedToken.consumed.is_(False))
+    )]
+
+def delete_expired_revocations(db: Session, now: int) -> int:
+    deleted = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+    db.commit()
+    return deleted.rowcount
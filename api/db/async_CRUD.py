@@ -0,0 +1,142 @@
+# Awaitable versions of db/CRUD.py for request handlers. Each one runs the sync
+# implementation through run_db, so the query logic lives in a single place.
+# Course writes invalidate the course cache (db/course_cache.py) in CRUD itself.
+from typing import Dict, List, Optional
+from db import CRUD
+from db.course_cache import course_cache, course_key, course_list_key, course_to_dict, get_or_load, list_generation
+from db.session import DBSession, run_db
+from utils.cache import MISSING
+from utils.principal_cache import evict_student_principals
+
+# Student CRUD Operations
+async def create_student(db: DBSession, name: str, email: str, password: str):
+    return await run_db(db, CRUD.create_student, name=name, email=email, password=password)
+
+async def get_student(db: DBSession, student_id: int):
+    return await run_db(db, CRUD.get_student, student_id)
+
+async def get_student_by_email(db: DBSession, email: str):
+    return await run_db(db, CRUD.get_student_by_email, email)
+
+async def delete_student(db: DBSession, student_id: int):
+    deleted = await run_db(db, CRUD.delete_student, student_id)
+    evict_student_principals(student_id)
+    return deleted
+
+# Course CRUD Operations
+async def create_course(db: DBSession, field: str, subject: Optional[str] = None,
+                        class_timing: Optional[str] = None, instructor_name: Optional[str] = None,
+                        course_pic: Optional[str] = None):
+    db_course = await run_db(
+        db, CRUD.create_course,
+        field=field,
+        subject=subject,
+        class_timing=class_timing,
+        instructor_name=instructor_name,
+        course_pic=course_pic
+    )
+    return db_course
+
+async def bulk_create_courses(db: DBSession, rows: List[dict]):
+    return await run_db(db, CRUD.bulk_create_courses, rows)
+
+async def get_course(db: DBSession, course_id: int):
+    return await run_db(db, CRUD.get_course, course_id)
+
+async def get_all_courses(db: DBSession, skip: int = 0, limit: int = 100, **filters):
+    return await run_db(db, CRUD.get_all_courses, skip=skip, limit=limit, **filters)
+
+async def get_courses_after(db: DBSession, after_id: Optional[int] = None, limit: int = 100, **filters):
+    return await run_db(db, CRUD.get_courses_after, after_id=after_id, limit=limit, **filters)
+
+async def get_course_rows(db: DBSession, columns: List[str], skip: int = 0, limit: int = 100,
+                          after_id: Optional[int] = None, **filters):
+    return await run_db(db, CRUD.get_course_rows, columns, skip=skip, limit=limit, after_id=after_id, **filters)
+
+async def count_courses(db: DBSession, **filters):
+    return await run_db(db, CRUD.count_courses, **filters)
+
+async def get_catalog_version(db: DBSession) -> str:
+    """Version stamp of the whole catalog, cached like the list pages"""
+    async def load():
+        count, latest = await run_db(db, CRUD.get_catalog_version)
+        return f"{count}-{latest.isoformat() if latest is not None else 0}"
+    return await get_or_load(course_list_key("version"), load)
+
+async def update_course(db: DBSession, course_id: int, **kwargs):
+    return await run_db(db, CRUD.update_course, course_id, **kwargs)
+
+async def delete_course(db: DBSession, course_id: int):
+    return await run_db(db, CRUD.delete_course, course_id)
+
+# Cached course reads. They return column dicts instead of ORM objects.
+# `version` (the catalog version an ETag was derived from) is part of the list
+# keys, so a page is never older than the ETag sent with it.
+async def get_course_cached(db: DBSession, course_id: int) -> Optional[dict]:
+    async def load():
+        db_course = await get_course(db, course_id)
+        return course_to_dict(db_course) if db_course is not None else None
+    return await get_or_load(course_key(course_id), load)
+
+async def get_courses_cached(db: DBSession, course_ids: List[int]) -> Dict[int, dict]:
+    """Existing courses among course_ids by id: cache hits, then one query for the misses"""
+    courses = {}
+    misses = []
+    for course_id in course_ids:
+        cached = course_cache.get(course_key(course_id))
+        if cached is MISSING:
+            misses.append(course_id)
+        else:
+            courses[course_id] = cached
+    if misses:
+        generation = list_generation()
+        loaded = await run_db(db, CRUD.get_courses_by_ids, misses)
+        # Like get_or_load: rows read before a concurrent write are not cached
+        fresh = list_generation() == generation
+        for course in loaded:
+            if fresh:
+                course_cache.set(course_key(course["id"]), course)
+            courses[course["id"]] = course
+    return courses
+
+async def get_all_courses_cached(db: DBSession, skip: int = 0, limit: int = 100, version: Optional[str] = None,
+                                 **filters):
+    async def load():
+        return [course_to_dict(course) for course in await get_all_courses(db, skip=skip, limit=limit, **filters)]
+    return await get_or_load(course_list_key("offset", version, skip, limit, *sorted(filters.items())), load)
+
+async def get_courses_after_cached(db: DBSession, after_id: Optional[int] = None, limit: int = 100,
+                                   version: Optional[str] = None, **filters):
+    async def load():
+        return [course_to_dict(course) for course in await get_courses_after(db, after_id=after_id, limit=limit, **filters)]
+    return await get_or_load(course_list_key("after", version, after_id, limit, *sorted(filters.items())), load)
+
+async def count_courses_cached(db: DBSession, version: Optional[str] = None, **filters) -> int:
+    """Total for the filters; shared by every page of the same listing"""
+    async def load():
+        return await count_courses(db, **filters)
+    return await get_or_load(course_list_key("count", version, *sorted(filters.items())), load)
+
+# Student-Course Relationship Operations
+async def enroll_student_in_course(db: DBSession, student_id: int, course_id: int):
+    return await run_db(db, CRUD.enroll_student_in_course, student_id, course_id)
+
+async def unenroll_student_from_course(db: DBSession, student_id: int, course_id: int):
+    return await run_db(db, CRUD.unenroll_student_from_course, student_id, course_id)
+
+async def bulk_enroll_students(db: DBSession, course_id: int, student_ids: List[int]):
+    return await run_db(db, CRUD.bulk_enroll_students, course_id, student_ids)
+
+async def get_student_courses(db: DBSession, student_id: int, skip: int = 0, limit: int = 100):
+    return await run_db(db, CRUD.get_student_courses, student_id, skip=skip, limit=limit)
+
+async def get_course_students(db: DBSession, course_id: int, skip: int = 0, limit: int = 100):
+    return await run_db(db, CRUD.get_course_students, course_id, skip=skip, limit=limit)
+
+# Token revocation
+async def revoke_token_id(db: DBSession, token_id: str, expires_at: int, revoked_at: int,
+                          consumed: bool = False):
+    return await run_db(db, CRUD.revoke_token_id, token_id, expires_at, revoked_at, consumed=consumed)
+
+async def get_revocation(db: DBSession, token_id: str):
+    return await run_db(db, CRUD.get_revocation, token_id)
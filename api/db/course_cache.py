@@ -0,0 +1,67 @@
+# Read-through cache in front of the course read queries. Entries are plain
+# column dicts, so they can be shared between sessions, workers and processes.
+import os
+from typing import Awaitable, Callable
+from db.models import Course
+from utils.cache import MISSING, LocalSharedClient, NullCache, SharedCache, TTLLRUCache
+
+# "memory" (per worker TTL+LRU), "shared" (Redis at COURSE_CACHE_URL, or an
+# in-process stand-in when no URL is set) or "none"
+COURSE_CACHE_BACKEND = os.getenv("COURSE_CACHE_BACKEND", "memory")
+COURSE_CACHE_URL = os.getenv("COURSE_CACHE_URL")
+COURSE_CACHE_TTL = float(os.getenv("COURSE_CACHE_TTL", 30))
+COURSE_CACHE_SIZE = int(os.getenv("COURSE_CACHE_SIZE", 2048))
+
+LIST_GENERATION_KEY = "courses:list-generation"
+
+
+def build_course_cache():
+    if COURSE_CACHE_BACKEND == "none":
+        return NullCache()
+    if COURSE_CACHE_BACKEND == "shared":
+        if COURSE_CACHE_URL:
+            import redis  # optional dependency, only needed for a real shared cache
+            client = redis.Redis.from_url(COURSE_CACHE_URL)
+        else:
+            client = LocalSharedClient()
+        return SharedCache(client, prefix="safeloan:", ttl=COURSE_CACHE_TTL)
+    return TTLLRUCache(maxsize=COURSE_CACHE_SIZE, ttl=COURSE_CACHE_TTL)
+
+
+course_cache = build_course_cache()
+
+
+def course_to_dict(course: Course) -> dict:
+    return {column.name: getattr(course, column.name) for column in Course.__table__.columns}
+
+def course_key(course_id: int) -> str:
+    return f"course:{course_id}"
+
+def list_generation() -> int:
+    # Bumped by every course write (see invalidate_course)
+    return course_cache.get_counter(LIST_GENERATION_KEY)
+
+def course_list_key(*parts) -> str:
+    # Every list entry embeds the current generation, so one increment
+    # invalidates all cached pages at once
+    return f"courses:{list_generation()}:" + ":".join(str(part) for part in parts)
+
+async def get_or_load(key: str, loader: Callable[[], Awaitable]):
+    cached = course_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    generation = list_generation()
+    value = await loader()
+    # A write invalidated while the loader ran: the value may predate it, and
+    # caching it would bring the stale data back until the TTL
+    if value is not None and list_generation() == generation:
+        course_cache.set(key, value)
+    return value
+
+def invalidate_course_lists():
+    course_cache.incr(LIST_GENERATION_KEY)
+
+def invalidate_course(*course_ids: int):
+    for course_id in course_ids:
+        course_cache.delete(course_key(course_id))
+    invalidate_course_lists()
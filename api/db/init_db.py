@@ -1,7 +1,14 @@
-from sqlalchemy import create_engine
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import create_engine, event, false, inspect, text, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from dotenv import load_dotenv
-from db.models import Base
+from db.models import Base, Course, RevokedToken
+from db.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from db.search import ensure_search_indexes
 import os
+import threading
 
 
 # Load environment variables
@@ -10,5 +17,137 @@ load_dotenv()
 # Connection URL for the database
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
+# Connection pool settings (ignored for SQLite, which manages its own pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# An async driver in the URL (postgresql+asyncpg://, sqlite+aiosqlite://) switches
+# the request path to AsyncSession. A sync engine on the same database is always
+# kept for DDL and scripts.
+DATABASE_IS_ASYNC = make_url(DATABASE_URL).get_dialect().is_async
+
+
+def pool_options(url, is_async: bool = False) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Engines are created on first use rather than at import, so importing the app
+# (a test, a CLI tool, a preloading gunicorn master) opens nothing and needs no
+# database driver. `engine` and `async_engine` stay importable names: they are
+# resolved through the module __getattr__ below.
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+# SQLite only enforces foreign keys when asked to, per connection
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def _create_engines():
+    global _engine, _async_engine
+    if DATABASE_IS_ASYNC:
+        async_engine = create_async_engine(DATABASE_URL, **pool_options(DATABASE_URL, is_async=True))
+        sync_url = make_url(DATABASE_URL).set(drivername=async_engine.url.get_backend_name())
+        engine = create_engine(sync_url, **pool_options(sync_url))
+    else:
+        async_engine = None
+        engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+        if async_engine is not None:
+            event.listen(async_engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+    _async_engine = async_engine
+    _engine = engine
+
+def get_engine() -> Engine:
+    """The sync engine (DDL, scripts and the sync request path), created on first call"""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _create_engines()
+    return _engine
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    """The async engine when DATABASE_URL names an async driver, otherwise None"""
+    get_engine()
+    return _async_engine
+
+async def dispose_engines():
+    """Close pooled connections (at shutdown); the engines reconnect if used again"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+def _forget_inherited_connections():
+    # A forked worker must not reuse the parent's pooled connections (preloaded
+    # app, or a parent that already ran init_schema); close=False leaves them
+    # open for the parent and gives the child a fresh pool
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_forget_inherited_connections)
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _add_course_updated_at(bind):
+    """Add Course.updated_at to tables created before it existed, stamped with the current time"""
+    if "updated_at" in {column["name"] for column in inspect(bind).get_columns(Course.__tablename__)}:
+        return
+    courses = Course.__table__
+    with bind.begin() as connection:
+        # No DEFAULT clause: SQLite cannot add a column with a non-constant default
+        column_type = courses.c.updated_at.type.compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {courses.name} ADD COLUMN updated_at {column_type}"))
+        connection.execute(update(courses).values(updated_at=datetime.now(timezone.utc)))
+
+def _add_revoked_token_consumed(bind):
+    """Add RevokedToken.consumed to tables created before it existed; old rows stay loaded"""
+    if "consumed" in {column["name"] for column in inspect(bind).get_columns(RevokedToken.__tablename__)}:
+        return
+    tokens = RevokedToken.__table__
+    with bind.begin() as connection:
+        column_type = tokens.c.consumed.type.compile(dialect=connection.dialect)
+        default = false().compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {tokens.name} ADD COLUMN consumed {column_type} NOT NULL DEFAULT {default}"))
+
+
+def init_schema(bind=None):
+    """Create missing tables and indexes. Run once per deploy, not on every worker start"""
+    bind = bind if bind is not None else get_engine()
+    Base.metadata.create_all(bind)
+    _add_course_updated_at(bind)
+    _add_revoked_token_consumed(bind)
+    # create_all skips indexes of tables that already exist
+    for index in Course.__table__.indexes:
+        index.create(bind, checkfirst=True)
+    ensure_search_indexes(bind)
+
+
+if __name__ == "__main__":
+    # python -m db.init_db
+    init_schema()
+    print("Database schema is up to date")
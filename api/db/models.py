@@ -1,15 +1,25 @@
-from sqlalchemy import Column, Integer, String, Date, Text, DateTime, func, Table, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Text, DateTime, Boolean, false, func, Table, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
-from datetime import datetime
+from datetime import datetime, timezone
+import os
 
 Base = declarative_base()
 
+# Loader strategy for the Student.courses / Course.students collections. Set to
+# "raise" (e.g. in tests and benchmarks) to turn any accidental lazy load into
+# an error; code that needs a collection must load it explicitly.
+DB_RELATIONSHIP_LAZY = os.getenv("DB_RELATIONSHIP_LAZY", "select")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
 
 students_courses = Table(
     'students_courses',
     Base.metadata,
-    Column('student_id', Integer, ForeignKey('students.id'), primary_key=True),
-    Column('course_id', Integer, ForeignKey('courses.id'), primary_key=True),
+    Column('student_id', Integer, ForeignKey('students.id', ondelete='CASCADE'), primary_key=True),
+    Column('course_id', Integer, ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True),
 )
 
 class Student(Base):
@@ -21,7 +31,8 @@ class Student(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    courses = relationship('Course', secondary=students_courses, back_populates='students')
+    courses = relationship('Course', secondary=students_courses, back_populates='students',
+                           lazy=DB_RELATIONSHIP_LAZY, passive_deletes=True)
 
     def __repr__(self):
         return f"<User(id={self.id}, username={self.name}, email={self.email})>"
@@ -35,8 +46,37 @@ class Course(Base):
     no_of_registered_students = Column(Integer, default=0)
     instructor_name = Column(String(50), nullable=True)
     course_pic = Column(String(255), nullable=True)
+    # Set in Python (not with now()) for sub-second resolution, since the HTTP
+    # ETags derive from it; onupdate also fires for core UPDATE statements such
+    # as the enrollment counter shifts and reconciliation
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow, server_default=func.now())
+
+    students = relationship('Student', secondary=students_courses, back_populates='courses',
+                            lazy=DB_RELATIONSHIP_LAZY, passive_deletes=True)
+
+    # Back the listing filters (full-text search over subject lives in db/search.py)
+    # and max(updated_at) for the catalog version
+    __table_args__ = (
+        Index('ix_courses_field_instructor', 'field', 'instructor_name'),
+        Index('ix_courses_instructor_name', 'instructor_name'),
+        Index('ix_courses_updated_at', 'updated_at'),
+    )
+
+    def __repr__(self):
+        return f"<Course(id={self.id}, name={self.field}, subject={self.subject})>"
+
 
-    students = relationship('Student', secondary=students_courses, back_populates='courses')
+class RevokedToken(Base):
+    """Token and session ids that must no longer be accepted (see utils/token_revocation.py)"""
+    __tablename__ = 'revoked_tokens'
+    # jti of a single token, or sid of a whole login session
+    token_id = Column(String(64), primary_key=True)
+    # Unix timestamps, like the JWT exp claim; rows are swept once expired
+    expires_at = Column(Integer, nullable=False, index=True)
+    revoked_at = Column(Integer, nullable=False, index=True)
+    # A rotated refresh token's jti: only checked in the database when the token
+    # comes back, so the workers do not load it into their in-memory set
+    consumed = Column(Boolean, nullable=False, default=False, server_default=false())
 
     def __repr__(self):
-        return f"<Course(id={self.id}, name={self.field}, subject={self.subject})>"
\ No newline at end of file
+        return f"<RevokedToken(token_id={self.token_id}, expires_at={self.expires_at})>"
@@ -0,0 +1,150 @@
+# Reconciliation of the denormalized Course.no_of_registered_students counter
+# with the real number of students_courses rows. Enrollment keeps the counter
+# exact, but PUT /courses/{id} can overwrite it and rows can disappear outside
+# the API, so a background worker re-checks courses in batches: one grouped
+# COUNT per batch, and an UPDATE only for the courses that drifted.
+#
+#     python -m db.reconcile                   # every course
+#     python -m db.reconcile --course-id 3 7   # selected courses
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from db.course_cache import invalidate_course
+from db.models import Course, students_courses
+from db.session import SessionFactory
+
+logger = logging.getLogger(__name__)
+
+# Seconds between passes over recently changed courses (0 disables the worker)
+COUNTER_RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", 60))
+# Seconds between full passes over every course (0: only changed courses)
+COUNTER_RECONCILE_FULL_SWEEP = float(os.getenv("COUNTER_RECONCILE_FULL_SWEEP", 3600))
+COUNTER_RECONCILE_BATCH = int(os.getenv("COUNTER_RECONCILE_BATCH", 500))
+
+# Courses whose counter may have been changed by this process since the last pass
+_dirty: Set[int] = set()
+_dirty_lock = threading.Lock()
+
+
+def mark_course_dirty(*course_ids: int):
+    with _dirty_lock:
+        _dirty.update(course_ids)
+
+def drain_dirty() -> List[int]:
+    with _dirty_lock:
+        course_ids = sorted(_dirty)
+        _dirty.clear()
+    return course_ids
+
+def reconcile_courses(db: Session, course_ids: List[int], dry_run: bool = False) -> List[dict]:
+    """Fix the counters of one batch of courses and return the ones that drifted"""
+    if not course_ids:
+        return []
+    counts = (
+        select(students_courses.c.course_id, func.count().label("actual"))
+        .where(students_courses.c.course_id.in_(course_ids))
+        .group_by(students_courses.c.course_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(Course.id, Course.no_of_registered_students, func.coalesce(counts.c.actual, 0))
+        .outerjoin(counts, counts.c.course_id == Course.id)
+        .where(Course.id.in_(course_ids))
+    ).all()
+    drifted = [
+        {"course_id": course_id, "stored": stored, "actual": actual}
+        for course_id, stored, actual in rows
+        if stored != actual
+    ]
+    if drifted and not dry_run:
+        # Recount inside the UPDATE so enrollments committed since the
+        # aggregate above are not overwritten with a stale value
+        actual = (
+            select(func.count())
+            .select_from(students_courses)
+            .where(students_courses.c.course_id == Course.id)
+            .scalar_subquery()
+        )
+        db.execute(
+            update(Course)
+            .where(Course.id.in_([row["course_id"] for row in drifted]))
+            .values(no_of_registered_students=actual)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        for row in drifted:
+            invalidate_course(row["course_id"])
+    return drifted
+
+def _batches(course_ids: Iterable[int], size: int) -> Iterable[List[int]]:
+    course_ids = list(course_ids)
+    for start in range(0, len(course_ids), size):
+        yield course_ids[start:start + size]
+
+def reconcile(course_ids: Optional[Iterable[int]] = None, batch_size: int = COUNTER_RECONCILE_BATCH,
+              dry_run: bool = False) -> dict:
+    """Reconcile the given courses, or every course in id order, one batch per transaction"""
+    started = time.perf_counter()
+    checked, drifted = 0, []
+    with SessionFactory() as db:
+        if course_ids is not None:
+            batches = _batches(course_ids, batch_size)
+        else:
+            batches = _all_course_batches(db, batch_size)
+        for batch in batches:
+            checked += len(batch)
+            drifted.extend(reconcile_courses(db, batch, dry_run=dry_run))
+    if drifted and not dry_run:
+        logger.warning("Reconciled registered-student counters of %d course(s)", len(drifted))
+    return {
+        "checked": checked,
+        "drifted": drifted,
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def _all_course_batches(db: Session, size: int) -> Iterable[List[int]]:
+    after_id = 0
+    while True:
+        batch = list(db.scalars(select(Course.id).where(Course.id > after_id).order_by(Course.id).limit(size)))
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1]
+
+async def reconciliation_worker(interval: float = COUNTER_RECONCILE_INTERVAL,
+                                full_sweep: float = COUNTER_RECONCILE_FULL_SWEEP):
+    """Run forever (until cancelled): changed courses every interval, all courses every full_sweep"""
+    last_sweep = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if full_sweep and time.monotonic() - last_sweep >= full_sweep:
+                drain_dirty()
+                await run_in_threadpool(reconcile)
+                last_sweep = time.monotonic()
+            else:
+                course_ids = drain_dirty()
+                if course_ids:
+                    await run_in_threadpool(reconcile, course_ids)
+        except Exception:
+            logger.exception("Counter reconciliation failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute Course.no_of_registered_students from students_courses")
+    parser.add_argument("--course-id", type=int, nargs="+", help="only these courses (default: all)")
+    parser.add_argument("--batch-size", type=int, default=COUNTER_RECONCILE_BATCH)
+    parser.add_argument("--dry-run", action="store_true", help="report drift without fixing it")
+    args = parser.parse_args()
+    print(json.dumps(reconcile(args.course_id, batch_size=args.batch_size, dry_run=args.dry_run), indent=2))
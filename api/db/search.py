@@ -0,0 +1,83 @@
+# Course filtering and full-text search over Course.subject.
+# PostgreSQL uses an expression GIN index on to_tsvector(subject); SQLite uses an
+# external-content FTS5 table kept in sync by triggers. Other databases fall
+# back to a LIKE scan.
+import re
+from typing import Optional
+from sqlalchemy import Column, Integer, MetaData, Table, Text, false, func, inspect, literal_column, text
+from db.models import Course
+
+# FTS5 table mirroring courses.subject (SQLite only); kept out of Base.metadata
+courses_fts = Table(
+    "courses_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("subject", Text),
+    Column("rank"),
+)
+
+POSTGRES_SEARCH_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_courses_subject_fts ON courses "
+    "USING gin (to_tsvector('english', coalesce(subject, '')))",
+)
+
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(subject, content='courses', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS courses_fts_ai AFTER INSERT ON courses BEGIN "
+    "INSERT INTO courses_fts(rowid, subject) VALUES (new.id, new.subject); END",
+    "CREATE TRIGGER IF NOT EXISTS courses_fts_ad AFTER DELETE ON courses BEGIN "
+    "INSERT INTO courses_fts(courses_fts, rowid, subject) VALUES ('delete', old.id, old.subject); END",
+    "CREATE TRIGGER IF NOT EXISTS courses_fts_au AFTER UPDATE OF subject ON courses BEGIN "
+    "INSERT INTO courses_fts(courses_fts, rowid, subject) VALUES ('delete', old.id, old.subject); "
+    "INSERT INTO courses_fts(rowid, subject) VALUES (new.id, new.subject); END",
+)
+
+
+def ensure_search_indexes(bind):
+    """Create the full-text structures for the connected database (idempotent)"""
+    with bind.begin() as connection:
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            for ddl in POSTGRES_SEARCH_DDL:
+                connection.execute(text(ddl))
+        elif dialect == "sqlite":
+            created = not inspect(connection).has_table("courses_fts")
+            for ddl in SQLITE_SEARCH_DDL:
+                connection.execute(text(ddl))
+            if created:
+                # Index rows that existed before the FTS table
+                connection.execute(text("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')"))
+
+def _subject_document():
+    # Must match the GIN index expression exactly for the planner to use it
+    return func.to_tsvector(literal_column("'english'"), func.coalesce(Course.subject, literal_column("''")))
+
+def fts5_query(search: str) -> Optional[str]:
+    """Quote each word so user input cannot inject FTS5 query syntax"""
+    words = re.findall(r"\w+", search)
+    return " ".join(f'"{word}"' for word in words) if words else None
+
+def apply_course_filters(query, dialect: str, field: Optional[str] = None,
+                         instructor_name: Optional[str] = None, search: Optional[str] = None):
+    """Add equality filters and text search (ordered by relevance) to a Query or Select"""
+    if field is not None:
+        query = query.where(Course.field == field)
+    if instructor_name is not None:
+        query = query.where(Course.instructor_name == instructor_name)
+    if not search:
+        return query
+
+    if dialect == "postgresql":
+        document = _subject_document()
+        ts_query = func.websearch_to_tsquery(literal_column("'english'"), search)
+        return query.where(document.op("@@")(ts_query)).order_by(func.ts_rank(document, ts_query).desc())
+    if dialect == "sqlite":
+        match = fts5_query(search)
+        if match is None:
+            return query.where(false())
+        return (
+            query.join(courses_fts, courses_fts.c.rowid == Course.id)
+            .where(literal_column("courses_fts").op("MATCH")(match))
+            .order_by(courses_fts.c.rank)
+        )
+    return query.where(Course.subject.ilike(f"%{search}%"))
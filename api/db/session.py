@@ -1,8 +1,39 @@
-from sqlalchemy.orm import sessionmaker
-from db.init_db import engine
+from typing import Union
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.concurrency import run_in_threadpool
+from db.init_db import DATABASE_IS_ASYNC, get_async_engine, get_engine
+
+
+# Sessions bind to the engines when they first need a connection, so creating
+# the factories (at import) does not create the engines
+class AppSession(Session):
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
+
+class AsyncAppSession(Session):
+    """Sync half of an AsyncSession, bound to the async engine"""
+
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_async_engine().sync_engine
+        return super().get_bind(*args, **kwargs)
+
 
 # Create a session factory
-SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionFactory = sessionmaker(class_=AppSession, autocommit=False, autoflush=False)
+
+# Async session factory, only available when DATABASE_URL names an async driver.
+# Objects stay loaded after commit so routes can serialize them without lazy IO.
+AsyncSessionFactory = (
+    async_sessionmaker(sync_session_class=AsyncAppSession, autoflush=False, expire_on_commit=False)
+    if DATABASE_IS_ASYNC else None
+)
+
+# What request handlers receive from get_async_db
+DBSession = Union[Session, AsyncSession]
 
 
 # Dependency to get the session
@@ -11,4 +42,28 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async dependency: an AsyncSession for async drivers, otherwise a regular
+# Session whose work is pushed to the threadpool by run_db
+async def get_async_db():
+    if AsyncSessionFactory is None:
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+        return
+
+    async with AsyncSessionFactory() as db:
+        yield db
+
+async def run_db(db: DBSession, fn, *args, **kwargs):
+    """Run a sync CRUD function without blocking the event loop.
+
+    AsyncSession runs it through run_sync (IO goes through the async driver),
+    a plain Session runs it in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
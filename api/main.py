@@ -1,22 +1,99 @@
+from contextlib import asynccontextmanager
+import asyncio
+import os
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from v1.courses.route import router as course_router
-from v1.auth.route import router as auth_router
 
+# Schema creation is normally a deploy step (python -m db.init_db); enable this
+# for local development to create missing tables when the app starts
+DB_CREATE_SCHEMA_ON_STARTUP = os.getenv("DB_CREATE_SCHEMA_ON_STARTUP", "false").lower() in ("1", "true", "yes")
 
-app = FastAPI()
 
-app.include_router(auth_router)
-app.include_router(course_router)
+# Per-worker resources (engines, background tasks, executors) are created here,
+# after any fork, never at import
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from starlette.concurrency import run_in_threadpool
+    from db.init_db import dispose_engines, get_engine, init_schema
+    from db.reconcile import COUNTER_RECONCILE_INTERVAL, reconciliation_worker
+    from utils.hashing_pass import shutdown_hash_executor
+    from utils.image_variants import shutdown_variant_executor
+    from utils.jwt_keys import get_key_ring
+    from utils.token_revocation import revocation_worker
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  
-    allow_credentials=True,
-    allow_methods=["*"],  
-    allow_headers=["*"],  
-)
+    # Fail at startup, not on the first login, when no signing key is configured
+    get_key_ring()
+    # Create the engines (and import the driver) before the first request needs them
+    await run_in_threadpool(get_engine)
+    if DB_CREATE_SCHEMA_ON_STARTUP:
+        await run_in_threadpool(init_schema)
+    reconciler = asyncio.create_task(reconciliation_worker()) if COUNTER_RECONCILE_INTERVAL > 0 else None
+    revocation_sync = asyncio.create_task(revocation_worker())
+    yield
+    if reconciler is not None:
+        reconciler.cancel()
+    revocation_sync.cancel()
+    shutdown_hash_executor()
+    shutdown_variant_executor()
+    await dispose_engines()
 
-@app.get("/")  
-def read_root():
-    return {"Hello": "World"}
\ No newline at end of file
+
+def create_app() -> FastAPI:
+    """Build the application. Importing this module stays cheap: routers and
+    middleware are imported here, and nothing touches the database until the
+    lifespan starts (so a preloading master can fork workers safely)."""
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import PlainTextResponse
+    from v1.courses.route import router as course_router
+    from v1.auth.route import router as auth_router
+    from v1.students.route import router as student_router
+    from v1.internal.route import INTERNAL_ENDPOINTS_ENABLED, router as internal_router
+    from utils.compression import CompressionMiddleware
+    from utils.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, render_metrics
+    from utils.rate_limit import RateLimitMiddleware
+    from utils.upload_limit import UploadLimitMiddleware
+
+    app = FastAPI(lifespan=lifespan)
+
+    app.include_router(auth_router)
+    app.include_router(course_router)
+    app.include_router(student_router)
+    if INTERNAL_ENDPOINTS_ENABLED:
+        app.include_router(internal_router)
+
+    # Added before CORS so that 413 and 429 responses still carry the CORS headers
+    app.add_middleware(UploadLimitMiddleware)
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Outside CORS and the rate limiter, so their responses are compressed too
+    app.add_middleware(CompressionMiddleware)
+
+    if METRICS_ENABLED:
+        # Every engine, including the ones the lifespan creates later
+        instrument_engine()
+        # Outermost, so the timings include every other middleware
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/metrics", include_in_schema=False)
+        def get_metrics():
+            return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/")
+    def read_root():
+        return {"Hello": "World"}
+
+    return app
+
+
+# `uvicorn main:app` (and `from main import app`) build the app on first access;
+# `uvicorn --factory main:create_app` builds it directly
+def __getattr__(name):
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
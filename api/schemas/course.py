@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class CourseBase(BaseModel):
     field: str
@@ -21,4 +21,32 @@ class CourseResponse(CourseBase):
     course_pic: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CoursePage(BaseModel):
+    items: List[CourseResponse]
+    next_cursor: Optional[str] = None
+
+class CourseBatch(BaseModel):
+    ids: List[int]
+
+class CourseBatchResult(BaseModel):
+    items: List[CourseResponse]
+    missing_ids: List[int] = []
+
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkCourseResult(BaseModel):
+    inserted: int
+    errors: List[BulkRowError] = []
+
+class EnrollmentBatch(BaseModel):
+    student_ids: List[int]
+
+class EnrollmentBatchResult(BaseModel):
+    enrolled: int
+    already_enrolled: int
+    missing_student_ids: List[int] = []
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+# Public view of a student in course rosters (no email)
+class StudentSummary(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
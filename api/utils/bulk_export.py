@@ -0,0 +1,70 @@
+# Streaming course exports, the counterpart of utils/bulk_import.py. Rows come
+# from the database one batch at a time and each batch is encoded into one
+# chunk of the response, so memory stays flat however large the catalog is.
+import csv
+import io
+import os
+from typing import Iterable, Iterator, List
+
+from db.CRUD import iter_course_export_batches
+from db.session import SessionFactory
+from utils.json_encoding import dumps
+
+# Rows fetched from the cursor (and encoded) per response chunk
+COURSE_EXPORT_BATCH = int(os.getenv("COURSE_EXPORT_BATCH", 1000))
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _courses_with_rosters(batches: Iterable[list], fields: List[str]) -> Iterator[list]:
+    """Fold the one-row-per-enrollment batches into course dicts with a "students"
+    list. A course whose rows straddle two batches is emitted with the later one."""
+    id_index = fields.index("id")
+    current = None
+    for rows in batches:
+        courses = []
+        for row in rows:
+            if current is None or current["id"] != row[id_index]:
+                if current is not None:
+                    courses.append(current)
+                current = dict(zip(fields, row))
+                current["students"] = []
+            student_id, student_name = row[-2:]
+            if student_id is not None:
+                current["students"].append({"id": student_id, "name": student_name})
+        yield courses
+    if current is not None:
+        yield [current]
+
+def ndjson_chunks(batches: Iterable[list], fields: List[str], include_students: bool) -> Iterator[bytes]:
+    if include_students:
+        courses = _courses_with_rosters(batches, fields)
+    else:
+        courses = ([dict(zip(fields, row)) for row in rows] for rows in batches)
+    for batch in courses:
+        if batch:
+            yield b"".join(dumps(course) + b"\n" for course in batch)
+
+def csv_chunks(batches: Iterable[list], fields: List[str], include_students: bool) -> Iterator[bytes]:
+    # With include_students: one line per enrollment, as the rows arrive
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields + ["student_id", "student_name"] if include_students else fields)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def export_courses(format: str, fields: List[str], include_students: bool = False,
+                   batch_size: int = COURSE_EXPORT_BATCH, **filters) -> Iterator[bytes]:
+    """Response body chunks. The generator owns its session for as long as the
+    response streams (the request's session may be closed before it starts);
+    it uses the sync engine, and StreamingResponse iterates it in the threadpool."""
+    encode = csv_chunks if format == "csv" else ndjson_chunks
+    with SessionFactory() as db:
+        batches = iter_course_export_batches(db, fields, include_students=include_students,
+                                             batch_size=batch_size, **filters)
+        yield from encode(batches, fields, include_students)
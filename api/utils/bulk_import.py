@@ -0,0 +1,84 @@
+# Incremental parsers for bulk course imports. Each yields (row_number, row, error)
+# tuples as the request body streams in, so large uploads are never held in memory.
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+BulkRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # Lines stay bytes: each row is decoded on its own, so invalid UTF-8 fails one row
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if buffer:
+        yield buffer.rstrip(b"\r")
+
+def decode_line(line: bytes) -> str:
+    # utf-8-sig drops the byte-order mark spreadsheet exports start with
+    return line.decode("utf-8-sig")
+
+async def iter_ndjson_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[BulkRow]:
+    row_number = 0
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(decode_line(line))
+            yield row_number, row, None if isinstance(row, dict) else "Row must be a JSON object"
+        except UnicodeDecodeError as e:
+            yield row_number, None, f"Invalid UTF-8: {e}"
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+        row_number += 1
+
+async def iter_csv_records(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # A quoted field may span lines: keep joining lines until the quotes balance
+    # (an escaped "" counts twice, so only an open field leaves an odd count)
+    record = None
+    async for line in iter_lines(stream):
+        record = line if record is None else record + b"\n" + line
+        if record.count(b'"') % 2 == 0:
+            yield record
+            record = None
+    if record is not None:
+        yield record
+
+async def iter_csv_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[BulkRow]:
+    # The first record is the header; empty cells become None
+    header = None
+    row_number = 0
+    async for record in iter_csv_records(stream):
+        if not record.strip():
+            continue
+        try:
+            values = next(csv.reader([decode_line(record)], strict=True))
+        except (csv.Error, UnicodeDecodeError) as e:
+            if header is None:
+                # Without a header no row can be read
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid CSV header: {e}"
+                )
+            kind = "UTF-8" if isinstance(e, UnicodeDecodeError) else "CSV"
+            yield row_number, None, f"Invalid {kind}: {e}"
+            row_number += 1
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row_number, {key: value or None for key, value in zip(header, values)}, None
+        row_number += 1
+
+async def iter_json_array_rows(rows: list) -> AsyncIterator[BulkRow]:
+    for row_number, row in enumerate(rows):
+        yield row_number, row, None if isinstance(row, dict) else "Row must be a JSON object"
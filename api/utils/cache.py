@@ -0,0 +1,248 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+# Returned by get() when a key is absent, so that None can be cached
+MISSING = object()
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def incr(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class CacheBackend:
+    """Interface shared by every cache backend"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def get_counter(self, key: str) -> int:
+        """Read a counter (used for invalidation generations, not counted in stats)"""
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter and return the new value"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def info(self) -> dict:
+        return {"backend": type(self).__name__, **self.stats.as_dict()}
+
+
+class NullCache(CacheBackend):
+    """Disables caching: every lookup is a miss"""
+
+    def get(self, key):
+        self.stats.incr("misses")
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def get_counter(self, key):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class TTLLRUCache(CacheBackend):
+    """In-process cache with a per-entry TTL and least-recently-used eviction"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        # Counters live outside the LRU so they are never evicted
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.stats.incr("hits")
+                    return value
+                del self._data[key]
+                self.stats.incr("expirations")
+        self.stats.incr("misses")
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.stats.incr("invalidations")
+
+    def delete_where(self, predicate: Callable[[str, Any], bool]) -> int:
+        """Drop every entry for which predicate(key, value) is true (O(n))"""
+        with self._lock:
+            doomed = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+            for key in doomed:
+                del self._data[key]
+        if doomed:
+            self.stats.incr("invalidations", len(doomed))
+        return len(doomed)
+
+    def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def info(self) -> dict:
+        return {**super().info(), "size": len(self._data), "maxsize": self.maxsize}
+
+
+class SharedCache(CacheBackend):
+    """Cache shared between workers through a Redis-compatible client.
+
+    The client only needs get/set(ex=)/delete/incr/flushdb, so redis.Redis works
+    as-is and LocalSharedClient can stand in for it locally.
+    """
+
+    def __init__(self, client, prefix: str = "", ttl: Optional[float] = 60):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.stats.incr("misses")
+            return MISSING
+        self.stats.incr("hits")
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        if self.client.delete(self.prefix + key):
+            self.stats.incr("invalidations")
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            # Seed from the clock so a counter lost to server-side eviction
+            # never comes back with a value that was already used
+            self.client.set(self.prefix + key, time.time_ns(), nx=True)
+            raw = self.client.get(self.prefix + key)
+        return int(raw)
+
+    def incr(self, key):
+        self.get_counter(key)
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        self.client.flushdb()
+
+
+class LocalSharedClient:
+    """In-memory stand-in for a Redis client (tests, benchmarks, single host)"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self._clock():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[0]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return False
+            self._data[key] = (value, self._clock() + ex if ex else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) is not None else 0
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._live(key)
+            value = int(entry[0]) + 1 if entry is not None else 1
+            self._data[key] = (value, entry[1] if entry is not None else None)
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
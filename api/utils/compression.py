@@ -0,0 +1,144 @@
+# Negotiated response compression (brotli when installed and accepted, else
+# gzip). Only textual content types are compressed, so images and other
+# already-compressed payloads pass through untouched and unbuffered. Complete
+# bodies under the size threshold are sent as is; streamed bodies are
+# compressed chunk by chunk with a flush after each, so clients still receive
+# data as it is produced.
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only without it
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Smaller (non-streamed) bodies are not worth the CPU or the extra header
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+# Brotli's high qualities are meant for static assets; 4 is cheaper than gzip -6 and smaller
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/jsonl",
+                      "application/javascript", "application/xml", "image/svg+xml")
+UNCOMPRESSED_STATUSES = frozenset({204, 206, 304})
+
+
+class GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality: int = COMPRESSION_BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported coding in an Accept-Encoding header (brotli wins ties)"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    candidates = [
+        (weights.get(coding, weights.get("*", 0.0)), coding == "br", coding)
+        for coding in COMPRESSORS
+    ]
+    weight, _, coding = max(candidates)
+    return coding if weight > 0 else None
+
+def is_compressible(status: int, headers: Headers) -> bool:
+    if status in UNCOMPRESSED_STATUSES or "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing textual responses for clients that accept it"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, enabled: bool = COMPRESSION_ENABLED):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if self.enabled and scope["type"] == "http":
+            encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether it is worth compressing
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=list(start.get("headers", ())))
+                compressible = is_compressible(start["status"], headers)
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                if not compressible or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send({**start, "headers": headers.raw})
+                    await send(message)
+                    return
+                compressor = COMPRESSORS[encoding]()
+                headers["Content-Encoding"] = encoding
+                del headers["Content-Length"]
+                if not more_body:
+                    body = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send({**start, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start, "headers": headers.raw})
+                start = None
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,18 @@
+# Entity tags for conditional GETs (If-None-Match -> 304 Not Modified)
+import hashlib
+from typing import Optional
+
+
+def weak_etag(*parts) -> str:
+    """Weak validator derived from whatever versions the representation depends on"""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header, as GET requests use it"""
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
@@ -1,4 +1,25 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
+from fastapi import HTTPException, status
+
+# bcrypt costs ~250ms of CPU per call, so it must never run on the event loop.
+# "thread" works well because bcrypt releases the GIL while hashing, "process"
+# isolates the work completely and "inline" runs on the caller (debugging only).
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 1))
+# Maximum number of hashing jobs (running + queued) before new ones get a 503
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 4 * HASH_POOL_SIZE))
+HASH_RETRY_AFTER_SECONDS = 1
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+_in_flight_lock = threading.Lock()
 
 
 def hash_password(password: str) -> str:
@@ -18,4 +39,59 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return bcrypt.checkpw(password_bytes, hashed_bytes)
     except ValueError:
         # If there's any issue with the hash format, return False
-        return False
\ No newline at end of file
+        return False
+
+def get_hash_executor() -> Optional[Executor]:
+    """Return the shared hashing pool, creating it on first use"""
+    global _executor
+    if HASH_EXECUTOR == "inline":
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if HASH_EXECUTOR == "process":
+                    _executor = ProcessPoolExecutor(max_workers=HASH_POOL_SIZE)
+                else:
+                    _executor = ThreadPoolExecutor(
+                        max_workers=HASH_POOL_SIZE,
+                        thread_name_prefix="password-hash"
+                    )
+    return _executor
+
+def shutdown_hash_executor():
+    """Stop the hashing pool (called on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def hash_queue_depth() -> int:
+    """Number of hashing jobs currently running or waiting for a worker"""
+    return _in_flight
+
+async def _run_in_hash_pool(func, *args):
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= HASH_QUEUE_LIMIT:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy - please retry shortly",
+                headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)}
+            )
+        _in_flight += 1
+    try:
+        executor = get_hash_executor()
+        if executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, *args)
+    finally:
+        with _in_flight_lock:
+            _in_flight -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
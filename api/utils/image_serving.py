@@ -0,0 +1,141 @@
+# Conditional and ranged delivery of stored images. Content-addressed uploads
+# never change, so they are served as immutable; legacy and bundled asset
+# names may be overwritten and get a short max-age instead.
+import hashlib
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from utils.cache import MISSING, TTLLRUCache
+from utils.etags import etag_matches
+from utils.storage import InvalidKey, Storage, StoredFile, asset_storage, storage
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = f"public, max-age={int(os.getenv('IMAGE_MAX_AGE', 3600))}, must-revalidate"
+
+# Uploads are named <sha256><ext>, their resized variants <sha256>_w<width>.webp
+_CONTENT_ADDRESSED_RE = re.compile(r"^([0-9a-f]{64}(?:_w\d+)?)(\.[a-z0-9]+)?$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# key -> (size, modified, etag, content type); revalidated against the file's stat
+_metadata_cache = TTLLRUCache(maxsize=4096, ttl=None)
+
+
+def sniff_content_type(key: str, head: bytes) -> str:
+    for magic, content_type in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+async def _read_head(store: Storage, key: str, size: int = 16) -> bytes:
+    head = b""
+    async for chunk in store.iter_bytes(key, 0, size - 1):
+        head += chunk
+    return head
+
+async def _content_digest(store: Storage, key: str) -> str:
+    match = _CONTENT_ADDRESSED_RE.match(key)
+    if match:
+        return match.group(1)
+    digest = hashlib.sha256()
+    async for chunk in store.iter_bytes(key):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+async def _locate(key: str) -> Tuple[Storage, StoredFile]:
+    try:
+        for store in (storage, asset_storage):
+            info = await store.stat(key)
+            if info is not None:
+                return store, info
+    except InvalidKey:
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Image {key} not found"
+    )
+
+async def _metadata(store: Storage, key: str, info: StoredFile) -> Tuple[str, str]:
+    cache_key = f"{id(store)}:{key}"
+    cached = _metadata_cache.get(cache_key)
+    if cached is not MISSING and cached[:2] == (info.size, info.modified):
+        return cached[2], cached[3]
+    etag = f'"{await _content_digest(store, key)}"'
+    content_type = sniff_content_type(key, await _read_head(store, key))
+    _metadata_cache.set(cache_key, (info.size, info.modified, etag, content_type))
+    return etag, content_type
+
+def _not_modified_since(header: str, modified: float) -> bool:
+    try:
+        return int(modified) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Single byte range as (start, end) inclusive; None when unsatisfiable"""
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+async def image_response(request: Request, key: str) -> Response:
+    store, info = await _locate(key)
+    etag, content_type = await _metadata(store, key, info)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(info.modified, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if _CONTENT_ADDRESSED_RE.match(key) else MUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    elif _not_modified_since(request.headers.get("if-modified-since"), info.modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = f'inline; filename="{key}"'
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, info.size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{info.size}"
+            return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            store.iter_bytes(key, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=content_type,
+            headers=headers
+        )
+
+    headers["Content-Length"] = str(info.size)
+    return StreamingResponse(store.iter_bytes(key), media_type=content_type, headers=headers)
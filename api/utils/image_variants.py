@@ -0,0 +1,118 @@
+# Resized WebP derivatives of uploaded course pictures. They are rendered in the
+# background on a small bounded pool after the upload has been answered; until
+# a variant exists, requests for it fall back to the original image.
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from utils.storage import InvalidKey, Storage, storage
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Empty disables variants
+IMAGE_VARIANT_WIDTHS = sorted(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "128,512").split(",") if width.strip()
+)
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+# Pictures waiting for or being processed; further uploads skip variants
+IMAGE_VARIANT_QUEUE_LIMIT = int(os.getenv("IMAGE_VARIANT_QUEUE_LIMIT", 32))
+# Larger pictures are left unprocessed: decoding a small file with huge
+# dimensions (a decompression bomb) would tie up a worker and its memory
+IMAGE_VARIANT_MAX_PIXELS = int(os.getenv("IMAGE_VARIANT_MAX_PIXELS", 40_000_000))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = 0
+
+
+def variants_enabled() -> bool:
+    return Image is not None and bool(IMAGE_VARIANT_WIDTHS)
+
+def variant_key(key: str, width: int) -> str:
+    stem = os.path.splitext(key)[0]
+    return f"{stem}_w{width}.webp"
+
+def render_variants(data: bytes, widths: List[int], quality: int = IMAGE_VARIANT_QUALITY) -> Dict[int, bytes]:
+    """Downscale an image to each width (never upscaling) and encode as WebP"""
+    rendered = {}
+    with Image.open(io.BytesIO(data)) as original:
+        # Only the header has been read so far; Pillow itself warns at
+        # MAX_IMAGE_PIXELS and only refuses at twice that
+        if original.width * original.height > IMAGE_VARIANT_MAX_PIXELS:
+            raise Image.DecompressionBombError(
+                f"{original.width}x{original.height} exceeds {IMAGE_VARIANT_MAX_PIXELS} pixels"
+            )
+        original.load()
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "transparency" in original.info else "RGB")
+        for width in widths:
+            if width >= original.width:
+                continue
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format="WEBP", quality=quality, method=4)
+            rendered[width] = buffer.getvalue()
+    return rendered
+
+def get_variant_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=IMAGE_VARIANT_WORKERS,
+                    thread_name_prefix="image-variants"
+                )
+    return _executor
+
+def shutdown_variant_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+async def generate_variants(key: str, store: Storage = storage):
+    """Render and store every configured variant of a stored image"""
+    global _pending
+    if not variants_enabled():
+        return
+    if _pending >= IMAGE_VARIANT_QUEUE_LIMIT:
+        logger.warning("Image variant queue full, skipping %s", key)
+        return
+    _pending += 1
+    try:
+        data = b"".join([chunk async for chunk in store.iter_bytes(key)])
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(get_variant_executor(), render_variants, data, IMAGE_VARIANT_WIDTHS)
+        for width, payload in rendered.items():
+            await store.put(variant_key(key, width), payload)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        logger.warning("Could not render variants for %s: %s", key, e)
+    finally:
+        _pending -= 1
+
+async def pick_variant(key: str, width: Optional[int], store: Storage = storage) -> str:
+    """Smallest stored variant at least `width` pixels wide, else the original"""
+    if width is None:
+        return key
+    for candidate in IMAGE_VARIANT_WIDTHS:
+        if candidate >= width:
+            try:
+                if await store.exists(variant_key(key, candidate)):
+                    return variant_key(key, candidate)
+            except InvalidKey:
+                return key
+            break
+    return key
@@ -0,0 +1,18 @@
+# Fast JSON encoding for responses built without Pydantic models. Uses orjson
+# when it is installed and falls back to the standard library.
+import json
+from typing import Iterable, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable[tuple]) -> list:
+    return [dict(zip(fields, row)) for row in rows]
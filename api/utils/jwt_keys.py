@@ -0,0 +1,119 @@
+# JWT signing keys, selected by the token's "kid" header. New tokens are signed
+# with the active key; tokens signed with any other listed key stay valid until
+# they expire, so keys can be rotated by adding the new key, switching the
+# active one and removing the old one once its tokens are gone.
+#
+# Keys come from (first match):
+#   JWT_KEYS_FILE  JSON {"active": "<kid>", "keys": {"<kid>": "<secret>", ...}},
+#                  re-read when the file changes, so rotation needs no restart
+#   JWT_KEYS       "<kid>:<secret>,<kid>:<secret>"; JWT_ACTIVE_KID picks the
+#                  signing key (default: the first one)
+#   SECRET_KEY     a single key with kid "default"
+# Tokens issued before kids were used carry no header; they are checked against
+# the "default" key (SECRET_KEY) when present, otherwise the active key.
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+JWT_KEYS = os.getenv("JWT_KEYS")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+JWT_KEYS_FILE = os.getenv("JWT_KEYS_FILE")
+# How often (seconds) JWT_KEYS_FILE is checked for changes
+JWT_KEYS_RELOAD_SECONDS = float(os.getenv("JWT_KEYS_RELOAD_SECONDS", 10))
+
+DEFAULT_KID = "default"
+
+
+class KeyRing(NamedTuple):
+    active_kid: str
+    keys: Dict[str, str]
+
+    @property
+    def active_secret(self) -> str:
+        return self.keys[self.active_kid]
+
+    def resolve_kid(self, kid: Optional[str]) -> str:
+        """Key id a token is checked against (tokens without a kid use the legacy key)"""
+        if kid is not None:
+            return kid
+        return DEFAULT_KID if DEFAULT_KID in self.keys else self.active_kid
+
+
+def _build(active_kid: Optional[str], keys: Dict[str, str]) -> KeyRing:
+    keys = {str(kid): str(secret) for kid, secret in keys.items() if secret}
+    if not keys:
+        raise ValueError("No JWT signing keys configured (set SECRET_KEY, JWT_KEYS or JWT_KEYS_FILE)")
+    active_kid = active_kid or next(iter(keys))
+    if active_kid not in keys:
+        raise ValueError(f"Active JWT key id {active_kid!r} is not among the configured keys")
+    return KeyRing(active_kid, keys)
+
+def parse_inline_keys(value: str, active_kid: Optional[str] = None) -> KeyRing:
+    keys = {}
+    for entry in value.split(","):
+        kid, separator, secret = entry.strip().partition(":")
+        if not separator or not kid:
+            raise ValueError("JWT_KEYS entries must look like <kid>:<secret>")
+        keys[kid] = secret
+    return _build(active_kid, keys)
+
+def load_keys_file(path: str) -> KeyRing:
+    with open(path) as source:
+        config = json.load(source)
+    return _build(config.get("active"), config.get("keys") or {})
+
+def _load_environment() -> KeyRing:
+    if JWT_KEYS:
+        return parse_inline_keys(JWT_KEYS, JWT_ACTIVE_KID)
+    return _build(DEFAULT_KID, {DEFAULT_KID: SECRET_KEY})
+
+
+_lock = threading.Lock()
+_file_mtime: Optional[float] = None
+_checked_at = 0.0
+# Loaded on first use (the app checks it at startup), so importing needs no keys
+_ring: Optional[KeyRing] = None
+
+
+def _reload_file():
+    global _ring, _file_mtime
+    try:
+        mtime = os.stat(JWT_KEYS_FILE).st_mtime
+        if mtime != _file_mtime:
+            _ring = load_keys_file(JWT_KEYS_FILE)
+            _file_mtime = mtime
+            logger.info("Loaded JWT keys %s (active: %s)", sorted(_ring.keys), _ring.active_kid)
+    except (OSError, ValueError) as e:
+        # Keep serving with the previous keys rather than rejecting every token
+        logger.error("Could not reload %s: %s", JWT_KEYS_FILE, e)
+
+def _load() -> KeyRing:
+    global _ring, _file_mtime
+    with _lock:
+        if _ring is None:
+            if JWT_KEYS_FILE:
+                _file_mtime = os.stat(JWT_KEYS_FILE).st_mtime
+                _ring = load_keys_file(JWT_KEYS_FILE)
+            else:
+                _ring = _load_environment()
+    return _ring
+
+def get_key_ring() -> KeyRing:
+    """The current keys; raises ValueError when none are configured"""
+    global _checked_at
+    if _ring is None:
+        return _load()
+    if JWT_KEYS_FILE:
+        now = time.monotonic()
+        if now - _checked_at >= JWT_KEYS_RELOAD_SECONDS:
+            with _lock:
+                if now - _checked_at >= JWT_KEYS_RELOAD_SECONDS:
+                    _reload_file()
+                    _checked_at = now
+    return _ring
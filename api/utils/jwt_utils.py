@@ -1,55 +1,114 @@
 import jwt
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 import os
-from fastapi import HTTPException, status, Depends, Cookie
-from sqlalchemy.orm import Session
-from db.models import Student
-from db.session import get_db
+from fastapi import HTTPException, status, Depends, Cookie, Response
+from db.session import DBSession, get_async_db
+from db.async_CRUD import get_revocation, get_student_by_email
+from schemas.auth import UserResponse
+from utils.cache import MISSING, NullCache, TTLLRUCache
+from utils.jwt_keys import get_key_ring
+from utils.principal_cache import principal_cache, principal_key
+from utils.token_revocation import consume, is_revoked, revoke
 
-SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256") 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 
 REFRESH_TOKEN_EXPIRE_DAYS = 7    
+# Trust the id/name claims embedded by create_access_token instead of looking
+# the student up. A deleted student keeps access until the token expires.
+JWT_TRUST_CLAIMS = os.getenv("JWT_TRUST_CLAIMS", "false").lower() in ("1", "true", "yes")
+# Verified tokens remembered by SHA-256 digest until they expire, so a token
+# presented on every request is only signature-checked once (0 disables)
+JWT_VERIFY_CACHE_SIZE = int(os.getenv("JWT_VERIFY_CACHE_SIZE", 10000))
+# A refresh token presented again within this many seconds of its rotation is
+# taken as concurrent requests racing, not as theft
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 10))
 
-# Validate required environment variables
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY environment variable is required")
+# digest -> (kid, payload); entries expire together with the token
+verified_tokens = TTLLRUCache(maxsize=JWT_VERIFY_CACHE_SIZE, ttl=None) if JWT_VERIFY_CACHE_SIZE > 0 else NullCache()
 
-def create_access_token(data: dict) -> str:
+def user_claims(user) -> dict:
+    """Token claims identifying a student (subject plus id and name)"""
+    return {"sub": user.email, "uid": user.id, "name": user.name}
+
+def _encode(claims: dict) -> str:
+    ring = get_key_ring()
+    return jwt.encode(claims, ring.active_secret, algorithm=ALGORITHM, headers={"kid": ring.active_kid})
+
+def _decode(token: str) -> dict:
+    """Check signature and expiry, reusing the result of an earlier check of the same token"""
+    ring = get_key_ring()
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = verified_tokens.get(digest)
+    if cached is not MISSING:
+        kid, payload = cached
+        # A key removed from the ring revokes its tokens immediately
+        if kid in ring.keys:
+            return dict(payload)
+        verified_tokens.delete(digest)
+
+    kid = ring.resolve_kid(jwt.get_unverified_header(token).get("kid"))
+    secret = ring.keys.get(kid)
+    if secret is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key {kid!r}")
+    payload = jwt.decode(token, secret, algorithms=[ALGORITHM])
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        verified_tokens.set(digest, (kid, payload), ttl=expires_in)
+    return dict(payload)
+
+# Every token has its own id (jti) and carries the id of the login session (sid)
+# it belongs to, so a single token or a whole session can be revoked
+def create_access_token(data: dict, sid: Optional[str] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({
         "exp": expire, 
         "type": "access",
-        "iat": datetime.now(timezone.utc)  # Add issued at time
+        "iat": datetime.now(timezone.utc),  # Add issued at time
+        "jti": uuid.uuid4().hex,
     })
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if sid is not None:
+        to_encode["sid"] = sid
+    return _encode(to_encode)
 
-def create_refresh_token(data: dict) -> str:
+def create_refresh_token(data: dict, sid: Optional[str] = None) -> str:
     to_encode = data.copy()
     # Use timezone-aware datetime
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({
         "exp": expire, 
         "type": "refresh",
-        "iat": datetime.now(timezone.utc)  # Add issued at time
+        "iat": datetime.now(timezone.utc),  # Add issued at time
+        "jti": uuid.uuid4().hex,
     })
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if sid is not None:
+        to_encode["sid"] = sid
+    return _encode(to_encode)
 
-def create_tokens(data: dict) -> Tuple[str, str]:
-    access_token = create_access_token(data)
-    refresh_token = create_refresh_token(data)
+def create_tokens(data: dict, sid: Optional[str] = None) -> Tuple[str, str]:
+    """Access and refresh token of a login session (a new one unless sid is given)"""
+    sid = sid or uuid.uuid4().hex
+    access_token = create_access_token(data, sid=sid)
+    refresh_token = create_refresh_token(data, sid=sid)
     return access_token, refresh_token
 
 def verify_access_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode(token)
         if payload.get("type") != "access":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type"
             )
+        if is_revoked(payload.get("jti"), payload.get("sid")):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Access token has been revoked"
+            )
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -64,12 +123,19 @@ def verify_access_token(token: str) -> dict:
 
 def verify_refresh_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode(token)
         if payload.get("type") != "refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type"
             )
+        # The jti of a refresh token is checked against the database when it
+        # is consumed (see refresh_session), only the session is checked here
+        if is_revoked(payload.get("sid")):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token has been revoked"
+            )
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -82,11 +148,83 @@ def verify_refresh_token(token: str) -> dict:
             detail="Invalid refresh token"
         )
 
+async def _resolve_user(db: DBSession, payload: dict) -> UserResponse:
+    email = payload.get("sub")
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+
+    if JWT_TRUST_CLAIMS and "uid" in payload and "name" in payload:
+        return UserResponse(id=payload["uid"], email=email, name=payload["name"])
+
+    key = principal_key(email, payload.get("iat"))
+    principal = principal_cache.get(key)
+    if principal is not MISSING:
+        return principal
+
+    user = await get_student_by_email(db, email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    principal = UserResponse.model_validate(user)
+    principal_cache.set(key, principal)
+    return principal
+
+async def refresh_session(db: DBSession, refresh_token: str, response: Response) -> UserResponse:
+    """Rotate a refresh token: it is consumed and a new token pair is set as cookies"""
+    payload = verify_refresh_token(refresh_token)
+    user = await _resolve_user(db, payload)
+    sid = payload.get("sid")
+    jti = payload.get("jti")
+    # Tokens issued before rotation have no jti and are simply replaced
+    if jti is not None and not await consume(db, jti, payload["exp"]):
+        revocation = await get_revocation(db, jti)
+        if revocation is not None and time.time() - revocation.revoked_at <= REFRESH_REUSE_GRACE_SECONDS:
+            # Parallel requests with the same cookie: the first one rotated it
+            set_access_cookie(response, create_access_token(user_claims(user), sid=sid))
+            return user
+        # An already rotated token came back, so it was most likely stolen
+        if sid is not None:
+            await revoke_session(db, sid)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected - please login again"
+        )
+
+    access_token, new_refresh_token = create_tokens(user_claims(user), sid=sid)
+    set_auth_cookies(response, access_token, new_refresh_token)
+    return user
+
+async def revoke_session(db: DBSession, sid: str):
+    # Rotation keeps extending a session, so its tokens can live this long
+    await revoke(db, sid, int(time.time()) + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60)
+
+async def revoke_tokens(db: DBSession, *tokens: Optional[str]):
+    """Revoke the sessions (or, for older tokens, just the tokens) behind cookies; invalid tokens are ignored"""
+    for token in tokens:
+        if not token:
+            continue
+        try:
+            payload = _decode(token)
+        except jwt.InvalidTokenError:
+            continue
+        if payload.get("sid") is not None:
+            await revoke_session(db, payload["sid"])
+        elif payload.get("jti") is not None:
+            await revoke(db, payload["jti"], payload["exp"])
+
 async def get_current_user(
+    response: Response,
     access_token: Optional[str] = Cookie(None),
     refresh_token: Optional[str] = Cookie(None),
-    db: Session = Depends(get_db)
-) -> Tuple[Student, Optional[str]]:
+    db: DBSession = Depends(get_async_db)
+) -> UserResponse:
+    """Authenticated student; an expired access token is renewed (and the refresh
+    token rotated) through the refresh token, with new cookies set on the response"""
     
     # If no access token, try refresh token
     if not access_token:
@@ -96,26 +234,9 @@ async def get_current_user(
                 detail="Not authenticated - no tokens provided"
             )
         
-        # Generate new access token from refresh token
+        # Generate new tokens from refresh token
         try:
-            payload = verify_refresh_token(refresh_token)
-            email = payload.get("sub")
-            if not email:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token payload"
-                )
-            
-            # Verify user exists before creating new token
-            user = db.query(Student).filter(Student.email == email).first()
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User not found"
-                )
-            
-            new_access_token = create_access_token({"sub": email})
-            return user, new_access_token
+            return await refresh_session(db, refresh_token, response)
             
         except HTTPException:
             raise
@@ -128,44 +249,13 @@ async def get_current_user(
     # Try to use access token
     try:
         payload = verify_access_token(access_token)
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
-        
-        user = db.query(Student).filter(Student.email == email).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        return user, None  
+        return await _resolve_user(db, payload)
         
     except HTTPException as e:
         # If access token expired, try refresh token
         if "expired" in e.detail.lower() and refresh_token:
             try:
-                payload = verify_refresh_token(refresh_token)
-                email = payload.get("sub")
-                if not email:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid token payload"
-                    )
-                
-                # Verify user exists
-                user = db.query(Student).filter(Student.email == email).first()
-                if not user:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="User not found"
-                    )
-                
-                new_access_token = create_access_token({"sub": email})
-                return user, new_access_token
+                return await refresh_session(db, refresh_token, response)
                 
             except HTTPException:
                 # Both tokens invalid/expired
@@ -178,9 +268,8 @@ async def get_current_user(
             raise
 
 # Helper function to handle cookie setting in routes
-def set_auth_cookies(response, access_token: str, refresh_token: str):
-    """Helper function to set authentication cookies with proper security"""
-    # Access token cookie (shorter expiry)
+def set_access_cookie(response, access_token: str):
+    """Helper function to set the access token cookie (e.g. after a refresh)"""
     response.set_cookie(
         key="access_token",
         value=access_token,
@@ -189,6 +278,11 @@ def set_auth_cookies(response, access_token: str, refresh_token: str):
         max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,  
         path="/"
     )
+
+def set_auth_cookies(response, access_token: str, refresh_token: str):
+    """Helper function to set authentication cookies with proper security"""
+    # Access token cookie (shorter expiry)
+    set_access_cookie(response, access_token)
     
     # Refresh token cookie (longer expiry)
     response.set_cookie(
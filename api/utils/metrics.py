@@ -0,0 +1,176 @@
+# Request instrumentation: per-route latency, status and DB usage, rendered in
+# the Prometheus text format at /metrics. Engine events count queries and time
+# spent in the database driver for the request that issued them (found through
+# a context variable, which follows the request into threadpool and run_sync
+# calls), so DB time can be told apart from the rest of the handler.
+#
+# With METRICS_ENABLED=false neither the middleware nor the engine listeners
+# are installed, so there is no per-request or per-query cost at all.
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.hashing_pass import hash_queue_depth
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Add a Server-Timing header (db, app and total milliseconds) to every response
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = _format_labels(self.labels, label_values)
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {values[-2]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-2]}")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+def _gauge(name: str, help: str, value: float) -> str:
+    return f"# HELP {name} {help}\n# TYPE {name} gauge\n{name} {value}"
+
+
+REQUEST_LABELS = ("method", "route", "status")
+request_duration = Histogram("http_request_duration_seconds", "Time to serve a request", REQUEST_LABELS)
+request_db_duration = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL during a request", REQUEST_LABELS
+)
+request_app_duration = Histogram(
+    "http_request_app_seconds", "Request time outside SQL execution (handler, serialization, hashing)",
+    REQUEST_LABELS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", REQUEST_LABELS, QUERY_COUNT_BUCKETS
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+def instrument_engine(engine=Engine):
+    """Attribute an engine's queries to the current request (an Engine or sync_engine;
+    by default the Engine class, i.e. every engine, including ones created later)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths share one label so scanners cannot blow up the series count
+    return getattr(route, "path", None) or "unmatched"
+
+def _server_timing(stats: RequestStats, elapsed: float) -> bytes:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+        f"app;dur={(elapsed - stats.db_seconds) * 1000:.1f}, total;dur={elapsed * 1000:.1f}"
+    ).encode()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics (and optionally Server-Timing)"""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    timing = _server_timing(stats, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", timing)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            labels = (scope["method"], _route_label(scope), str(status))
+            request_duration.observe(labels, elapsed)
+            request_db_duration.observe(labels, stats.db_seconds)
+            request_app_duration.observe(labels, max(elapsed - stats.db_seconds, 0.0))
+            request_queries.observe(labels, stats.queries)
+
+
+def render_metrics() -> str:
+    sections = [
+        request_duration.render(),
+        request_db_duration.render(),
+        request_app_duration.render(),
+        request_queries.render(),
+        _gauge("password_hash_queue_depth", "Password hashing jobs running or queued", hash_queue_depth()),
+    ]
+    return "\n".join(sections) + "\n"
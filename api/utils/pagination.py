@@ -0,0 +1,27 @@
+import base64
+import binascii
+import json
+from typing import Optional
+from fastapi import HTTPException, status
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor pointing just after the row with id `last_id`"""
+    raw = json.dumps({"after": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """Return the id to continue after; an empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded))["after"]
+        if not isinstance(after_id, int):
+            raise ValueError(after_id)
+        return after_id
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
@@ -0,0 +1,17 @@
+# Authenticated students keyed by token subject and issue time, so a valid
+# access token can be resolved without a database round-trip.
+import os
+from utils.cache import TTLLRUCache
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096))
+
+principal_cache = TTLLRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def principal_key(subject: str, issued_at) -> str:
+    return f"{subject}:{issued_at}"
+
+def evict_student_principals(student_id: int):
+    """Forget every cached principal of a student (e.g. after deletion)"""
+    principal_cache.delete_where(lambda key, principal: principal.id == student_id)
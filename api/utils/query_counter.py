@@ -0,0 +1,55 @@
+# Counts SQL statements sent through the application's engines. Used to assert
+# that an endpoint issues a fixed number of queries however many rows it
+# returns (i.e. no N+1 loading), e.g.
+#
+#     with assert_max_queries(2):
+#         client.get("/students/me/courses")
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db.init_db import get_async_engine, get_engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+def _default_engines() -> List[Engine]:
+    engines = [get_engine()]
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        engines.append(async_engine.sync_engine)
+    return engines
+
+@contextmanager
+def count_queries(*engines: Engine) -> Iterator[QueryCounter]:
+    """Record every statement executed on the given (default: the app's) engines"""
+    counter = QueryCounter()
+    engines = engines or tuple(_default_engines())
+    for bind in engines:
+        event.listen(bind, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        for bind in engines:
+            event.remove(bind, "before_cursor_execute", counter._record)
+
+@contextmanager
+def assert_max_queries(limit: int, *engines: Engine, label: Optional[str] = None) -> Iterator[QueryCounter]:
+    """Fail with the offending statements if more than `limit` queries run"""
+    with count_queries(*engines) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise AssertionError(f"{label or 'block'} ran {counter.count} queries (limit {limit}):\n{statements}")
@@ -0,0 +1,203 @@
+# Throttling for the credential endpoints. Every login or registration costs a
+# bcrypt hash, so bursts are rejected with 429 by middleware before the request
+# reaches the route: first per client IP, then per email address in the body.
+#
+# The "memory" backend keeps one token bucket per key in a bounded LRU (limits
+# are per worker); the "shared" backend counts in a Redis-compatible store so
+# that all workers share the same limits.
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from utils.cache import LocalSharedClient
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# "memory" or "shared" (Redis at RATE_LIMIT_URL, or an in-process stand-in)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL")
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", 30))
+RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", 10))
+RATE_LIMIT_EMAIL_PER_MINUTE = float(os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", 5))
+RATE_LIMIT_EMAIL_BURST = int(os.getenv("RATE_LIMIT_EMAIL_BURST", 5))
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", 100000))
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+RATE_LIMITED_PATHS = frozenset({"/auth/login", "/auth/register"})
+# Larger bodies are rejected with 413: one the middleware could not parse for an
+# email would skip the per-email bucket (the login schema ignores extra fields)
+MAX_INSPECTED_BODY = 16 * 1024
+
+
+class RateLimitBackend:
+    """Interface for rate-limit stores"""
+
+    def hit(self, key: str, per_second: float, burst: int) -> float:
+        """Take one token for key; 0 when allowed, otherwise seconds until one is available"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token buckets in an LRU; the least recently used bucket is dropped when full
+    (a dropped bucket would have refilled by the time its key comes back, in practice)"""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_BUCKETS, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, per_second, burst):
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                while len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                tokens, updated_at = bucket
+                bucket[0] = min(float(burst), tokens + (now - updated_at) * per_second)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / per_second
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SharedRateLimitBackend(RateLimitBackend):
+    """Fixed-window counters (burst requests per burst/rate seconds) in a
+    Redis-compatible store; only needs set(ex=, nx=) and incr, like SharedCache"""
+
+    def __init__(self, client, prefix: str = "ratelimit:", clock: Callable[[], float] = time.time):
+        self.client = client
+        self.prefix = prefix
+        self._clock = clock
+
+    def hit(self, key, per_second, burst):
+        window = burst / per_second
+        now = self._clock()
+        window_start = math.floor(now / window) * window
+        counter_key = f"{self.prefix}{key}:{int(window_start)}"
+        self.client.set(counter_key, 0, ex=max(1, math.ceil(window)), nx=True)
+        if int(self.client.incr(counter_key)) <= burst:
+            return 0.0
+        return window_start + window - now
+
+
+def build_rate_limit_backend() -> RateLimitBackend:
+    if RATE_LIMIT_BACKEND == "shared":
+        if RATE_LIMIT_URL:
+            import redis  # optional dependency, only needed for a real shared store
+            return SharedRateLimitBackend(redis.Redis.from_url(RATE_LIMIT_URL))
+        return SharedRateLimitBackend(LocalSharedClient(clock=time.time))
+    return MemoryRateLimitBackend()
+
+
+def _client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _email_from_body(body: bytes) -> Optional[str]:
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the per-IP and per-email buckets to RATE_LIMITED_PATHS"""
+
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.backend = backend or build_rate_limit_backend()
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] != "POST" \
+                or scope["path"] not in RATE_LIMITED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = self.backend.hit(f"ip:{_client_ip(scope)}", RATE_LIMIT_IP_PER_MINUTE / 60, RATE_LIMIT_IP_BURST)
+        if retry_after:
+            await self._reject(send, retry_after)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                if value.isdigit() and int(value) > MAX_INSPECTED_BODY:
+                    await self._reject_too_large(send)
+                    return
+                break
+
+        # Read the (small) body to find the email, then replay it to the route
+        messages, body, more_body = [], b"", True
+        while more_body and len(body) <= MAX_INSPECTED_BODY:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        if len(body) > MAX_INSPECTED_BODY:
+            # Chunked, so there was no Content-Length to check up front
+            await self._reject_too_large(send)
+            return
+
+        email = _email_from_body(body)
+        if email:
+            retry_after = self.backend.hit(
+                f"email:{email}", RATE_LIMIT_EMAIL_PER_MINUTE / 60, RATE_LIMIT_EMAIL_BURST
+            )
+            if retry_after:
+                await self._reject(send, retry_after)
+                return
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    @staticmethod
+    async def _reject(send, retry_after: float):
+        body = b'{"detail":"Too many requests - please retry later"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _reject_too_large(send):
+        body = b'{"detail":"Request body is too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,214 @@
+# Content-addressed storage for uploaded files. Files are named after the
+# SHA-256 of their content, so identical uploads are stored once and names
+# never collide. Backends are pluggable; LocalStorage writes to UPLOAD_DIR and
+# MemoryStorage is a stand-in for tests (or for a future object-store backend).
+import hashlib
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple, Optional
+
+import anyio
+from fastapi import UploadFile
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads/")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+# Bundled read-only images (biology, mathematics, physics), served like uploads
+ASSETS_DIR = os.getenv("ASSETS_DIR", str(Path(__file__).resolve().parents[2] / "assets"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class StoredFile(NamedTuple):
+    size: int
+    modified: float
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidKey(ValueError):
+    pass
+
+
+def normalize_extension(filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION_RE.match(extension) else ""
+
+def validate_key(key: str) -> str:
+    """Keys are bare file names; anything that could escape the store is rejected"""
+    if not key or key != os.path.basename(key) or key.startswith(".") or "\\" in key:
+        raise InvalidKey(key)
+    return key
+
+async def iter_upload(upload: UploadFile, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class Storage:
+    """Interface for storage backends"""
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], extension: str = "",
+                          max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+        """Store a stream under its content hash and return the key.
+
+        Raises UploadTooLarge once more than max_bytes have been received.
+        """
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def stat(self, key: str) -> Optional[StoredFile]:
+        """Size and modification time, or None when the key is not stored"""
+        raise NotImplementedError
+
+    def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream bytes start..end (inclusive) of a stored file"""
+        raise NotImplementedError
+
+    async def put(self, key: str, data: bytes):
+        """Store bytes under an explicit key (derived files such as thumbnails)"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    def location(self, key: str) -> str:
+        """Value persisted in Course.course_pic for a key"""
+        return key
+
+    async def save_upload(self, upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+        if upload.size is not None and upload.size > max_bytes:
+            raise UploadTooLarge(upload.filename)
+        return await self.save_stream(iter_upload(upload), normalize_extension(upload.filename), max_bytes)
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, validate_key(key))
+
+    def location(self, key: str) -> str:
+        return self.path(key)
+
+    async def save_stream(self, chunks, extension="", max_bytes=MAX_UPLOAD_BYTES):
+        await anyio.Path(self.root).mkdir(parents=True, exist_ok=True)
+        temp_path = anyio.Path(self.root) / f".upload-{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with await anyio.open_file(temp_path, "wb") as buffer:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+
+            key = digest.hexdigest() + extension
+            final_path = anyio.Path(self.path(key))
+            if await final_path.exists():
+                # Same content is already stored
+                await temp_path.unlink()
+            else:
+                # Atomic on the same filesystem: readers never see a partial file
+                await temp_path.replace(final_path)
+            return key
+        except BaseException:
+            await temp_path.unlink(missing_ok=True)
+            raise
+
+    async def exists(self, key):
+        return await anyio.Path(self.path(key)).is_file()
+
+    async def stat(self, key):
+        path = anyio.Path(self.path(key))
+        if not await path.is_file():
+            return None
+        result = await path.stat()
+        return StoredFile(size=result.st_size, modified=result.st_mtime)
+
+    async def iter_bytes(self, key, start=0, end=None):
+        async with await anyio.open_file(self.path(key), "rb") as source:
+            await source.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await source.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def put(self, key, data):
+        await anyio.Path(self.root).mkdir(parents=True, exist_ok=True)
+        temp_path = anyio.Path(self.root) / f".upload-{uuid.uuid4().hex}.tmp"
+        try:
+            await temp_path.write_bytes(data)
+            await temp_path.replace(self.path(key))
+        except BaseException:
+            await temp_path.unlink(missing_ok=True)
+            raise
+
+    async def delete(self, key):
+        await anyio.Path(self.path(key)).unlink(missing_ok=True)
+
+
+class MemoryStorage(Storage):
+    def __init__(self):
+        self.files = {}
+
+    async def save_stream(self, chunks, extension="", max_bytes=MAX_UPLOAD_BYTES):
+        digest = hashlib.sha256()
+        parts = []
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            parts.append(chunk)
+        key = digest.hexdigest() + extension
+        self.files.setdefault(key, (b"".join(parts), time.time()))
+        return key
+
+    async def exists(self, key):
+        return validate_key(key) in self.files
+
+    async def stat(self, key):
+        entry = self.files.get(validate_key(key))
+        return None if entry is None else StoredFile(size=len(entry[0]), modified=entry[1])
+
+    async def iter_bytes(self, key, start=0, end=None):
+        data = self.files[validate_key(key)][0]
+        stop = len(data) if end is None else end + 1
+        for offset in range(start, stop, CHUNK_SIZE):
+            yield data[offset:min(offset + CHUNK_SIZE, stop)]
+
+    async def put(self, key, data):
+        self.files[validate_key(key)] = (bytes(data), time.time())
+
+    async def delete(self, key):
+        self.files.pop(validate_key(key), None)
+
+
+def build_storage() -> Storage:
+    if STORAGE_BACKEND == "memory":
+        return MemoryStorage()
+    return LocalStorage(UPLOAD_DIR)
+
+
+storage = build_storage()
+asset_storage = LocalStorage(ASSETS_DIR)
@@ -0,0 +1,75 @@
+# Revoked token ids (jti) and login session ids (sid). Each worker keeps the
+# unexpired revocations in memory, so the per-request check is a dict lookup
+# (consumed refresh token jtis stay in the database only, see consume);
+# the revoked_tokens table is the durable copy shared by all workers. Other
+# workers see a revocation after their next sync, and expired entries are
+# swept from both places periodically.
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from db import CRUD
+from db.async_CRUD import revoke_token_id
+from db.session import DBSession, SessionFactory
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", 15))
+TOKEN_REVOCATION_SWEEP_SECONDS = float(os.getenv("TOKEN_REVOCATION_SWEEP_SECONDS", 3600))
+# Incremental syncs re-read this many seconds to cover clock skew between workers
+SYNC_OVERLAP_SECONDS = 5
+
+# token/session id -> expires_at (Unix time)
+_revoked: Dict[str, int] = {}
+_last_sync: Optional[int] = None
+
+
+def is_revoked(*token_ids: Optional[str]) -> bool:
+    return any(token_id is not None and token_id in _revoked for token_id in token_ids)
+
+async def revoke(db: DBSession, token_id: str, expires_at: int) -> bool:
+    """Revoke an id until expires_at; False when it had already been revoked"""
+    _revoked[token_id] = int(expires_at)
+    return await revoke_token_id(db, token_id, int(expires_at), int(time.time()))
+
+async def consume(db: DBSession, token_id: str, expires_at: int) -> bool:
+    """Mark a refresh token jti as used; False when it had already been used (or revoked).
+    Every rotation consumes one, so they are kept out of the in-memory set."""
+    return await revoke_token_id(db, token_id, int(expires_at), int(time.time()), consumed=True)
+
+def sync(db, sweep: bool = False) -> int:
+    """Load revocations recorded since the last sync (by any worker)"""
+    global _last_sync
+    now = int(time.time())
+    since = 0 if _last_sync is None else _last_sync - SYNC_OVERLAP_SECONDS
+    rows = CRUD.get_revocations_since(db, since, now)
+    _revoked.update(rows)
+    _last_sync = now
+    if sweep:
+        for token_id, expires_at in list(_revoked.items()):
+            if expires_at <= now:
+                _revoked.pop(token_id, None)
+        CRUD.delete_expired_revocations(db, now)
+    return len(rows)
+
+def _sync_once(sweep: bool):
+    with SessionFactory() as db:
+        sync(db, sweep=sweep)
+
+async def revocation_worker(sync_interval: float = TOKEN_REVOCATION_SYNC_SECONDS,
+                            sweep_interval: float = TOKEN_REVOCATION_SWEEP_SECONDS):
+    """Sync at startup and every sync_interval, sweeping every sweep_interval (until cancelled)"""
+    last_sweep = time.monotonic()
+    while True:
+        sweep = time.monotonic() - last_sweep >= sweep_interval
+        try:
+            await run_in_threadpool(_sync_once, sweep)
+            if sweep:
+                last_sweep = time.monotonic()
+        except Exception:
+            logger.exception("Token revocation sync failed")
+        await asyncio.sleep(sync_interval)
@@ -0,0 +1,65 @@
+# Early size limit for the upload endpoints. Starlette spools a multipart body
+# to a temporary file before the route runs, so the MAX_UPLOAD_BYTES check in
+# Storage.save_upload alone comes after an oversized body has been received.
+# This middleware answers 413 from the Content-Length header before reading
+# anything, and stops reading a chunked body as soon as it passes the limit.
+import os
+
+from fastapi import HTTPException, status
+
+from utils.storage import MAX_UPLOAD_BYTES
+
+# Multipart boundaries and part headers on top of the file itself
+UPLOAD_FORM_OVERHEAD = int(os.getenv("UPLOAD_FORM_OVERHEAD", 64 * 1024))
+
+UPLOAD_LIMITED_PATHS = frozenset({"/courses/"})
+
+TOO_LARGE_DETAIL = "Request body is too large"
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping the request body of POSTs to UPLOAD_LIMITED_PATHS"""
+
+    def __init__(self, app, max_body: int = MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in UPLOAD_LIMITED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_body:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # FastAPI re-raises an HTTPException from body parsing as is
+                    raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send):
+        body = b'{"detail":"' + TOO_LARGE_DETAIL.encode() + b'"}'
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_CONTENT_TOO_LARGE,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,10 +1,12 @@
-from fastapi import Depends, Response, APIRouter, status, HTTPException
-from sqlalchemy.orm import Session
-from db.session import get_db
-from db.models import Student
-from db.CRUD import create_student
-from utils.jwt_utils import create_tokens, set_auth_cookies, get_current_user
-from utils.hashing_pass import verify_password, hash_password
+from fastapi import Cookie, Depends, Response, APIRouter, status, HTTPException
+from typing import Optional
+from db.session import DBSession, get_async_db
+from db.async_CRUD import create_student, get_student_by_email
+from utils.jwt_utils import (
+    create_tokens, set_auth_cookies, clear_auth_cookies, get_current_user, user_claims,
+    refresh_session, revoke_tokens
+)
+from utils.hashing_pass import verify_password_async, hash_password_async
 from schemas.auth import UserLogin, UserResponse, UserCreate
 router = APIRouter(
     prefix="/auth",
@@ -16,16 +18,16 @@ router = APIRouter(
 async def login(
     user: UserLogin,
     response: Response,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_async_db),
 ): 
-    user_db = db.query(Student).filter(Student.email == user.email).first()
-    if not user or not verify_password(user.password, user_db.password):
+    user_db = await get_student_by_email(db, user.email)
+    if not user_db or not await verify_password_async(user.password, user_db.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
-    access_token, refresh_token = create_tokens({"sub": user.email})
+    access_token, refresh_token = create_tokens(user_claims(user_db))
     set_auth_cookies(response, access_token, refresh_token)
 
     return UserResponse(
@@ -34,21 +36,39 @@ async def login(
         name=user_db.name
     )
 
+# Revokes the whole login session, so copies of its tokens stop working too
 @router.post("/logout", status_code=status.HTTP_200_OK)
 async def logout(
     response: Response,
+    access_token: Optional[str] = Cookie(None),
+    refresh_token: Optional[str] = Cookie(None),
+    db: DBSession = Depends(get_async_db),
 ): 
-    response.delete_cookie("access_token")
-    response.delete_cookie("refresh_token")
+    await revoke_tokens(db, access_token, refresh_token)
+    clear_auth_cookies(response)
     return {"message": "Logged out successfully"}
 
+# Exchange the refresh token for a new token pair (the old one is consumed)
+@router.post("/refresh", response_model=UserResponse, status_code=status.HTTP_200_OK)
+async def refresh(
+    response: Response,
+    refresh_token: Optional[str] = Cookie(None),
+    db: DBSession = Depends(get_async_db),
+):
+    if not refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated - no refresh token provided"
+        )
+    return await refresh_session(db, refresh_token, response)
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user: UserCreate,
     response: Response,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_async_db),
 ): 
-    existing_user = db.query(Student).filter(Student.email == user.email).first()
+    existing_user = await get_student_by_email(db, user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -56,9 +76,9 @@ async def register(
         )
         
     # Hash the password before storing it
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
 
-    new_user = create_student(
+    new_user = await create_student(
         db=db,
         name=user.name,
         email=user.email,
@@ -66,7 +86,7 @@ async def register(
     )
 
     # Set auth cookies
-    access_token, refresh_token = create_tokens({"sub": new_user.email})
+    access_token, refresh_token = create_tokens(user_claims(new_user))
     set_auth_cookies(response, access_token, refresh_token)
 
     return UserResponse(
@@ -1,52 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
-from db.session import get_db
-from db.CRUD import create_course, get_course, get_all_courses, update_course, delete_course
-from schemas.course import CourseUpdate, CourseResponse
-import shutil
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Literal, Optional, Union
 import os
-from datetime import datetime
-from pathlib import Path
+from db.session import DBSession, get_async_db
+from db.course_cache import course_list_key, get_or_load
+from db.async_CRUD import (
+    create_course, get_course_cached, get_courses_cached, get_all_courses_cached, get_courses_after_cached,
+    get_course_rows, count_courses_cached, get_catalog_version, update_course, delete_course,
+    enroll_student_in_course, unenroll_student_from_course, get_course_students,
+    bulk_create_courses, bulk_enroll_students
+)
+from db.CRUD import BULK_CHUNK_SIZE
+from schemas.course import (
+    CourseBase, CourseUpdate, CourseResponse, CoursePage, CourseBatch, CourseBatchResult,
+    BulkCourseResult, BulkRowError, EnrollmentBatch, EnrollmentBatchResult
+)
+from schemas.student import StudentSummary
+from utils.bulk_export import EXPORT_MEDIA_TYPES, export_courses
+from utils.bulk_import import iter_csv_rows, iter_json_array_rows, iter_ndjson_rows
+from utils.pagination import encode_cursor, decode_cursor
+from utils.jwt_utils import get_current_user
+from schemas.auth import UserResponse
+from utils.storage import UploadTooLarge, storage
+from utils.image_serving import image_response
+from utils.image_variants import generate_variants, pick_variant
+from utils.json_encoding import dumps, rows_to_dicts
+from utils.etags import etag_matches, weak_etag
 
-UPLOAD_DIR = "uploads/"
+# Build course listings from row tuples straight into JSON bytes, skipping ORM
+# objects and per-item CourseResponse validation (false: use the ORM path)
+COURSE_LIST_FAST_PATH = os.getenv("COURSE_LIST_FAST_PATH", "true").lower() in ("1", "true", "yes")
+COURSE_RESPONSE_FIELDS = list(CourseResponse.model_fields)
+# Course JSON carries an ETag; clients revalidate with If-None-Match and get 304
+COURSE_CACHE_CONTROL = os.getenv("COURSE_CACHE_CONTROL", "no-cache")
+# Most ids accepted by one /courses:batch request
+COURSE_BATCH_MAX_IDS = int(os.getenv("COURSE_BATCH_MAX_IDS", 1000))
 
 router = APIRouter(
     prefix="/courses",
     tags=["courses"]
 )
 
+
+async def _course_listing_json(db: DBSession, skip: int, limit: int, after_id: Optional[int], keyset: bool,
+                               version: str, **filters) -> bytes:
+    async def load():
+        rows = await get_course_rows(db, COURSE_RESPONSE_FIELDS, skip=skip, limit=limit, after_id=after_id, **filters)
+        items = rows_to_dicts(COURSE_RESPONSE_FIELDS, rows)
+        if not keyset:
+            return dumps(items)
+        next_cursor = encode_cursor(items[-1]["id"]) if items and len(items) == limit else None
+        return dumps({"items": items, "next_cursor": next_cursor})
+
+    if keyset:
+        key = course_list_key("json-after", version, after_id, limit, *sorted(filters.items()))
+    else:
+        key = course_list_key("json-offset", version, skip, limit, *sorted(filters.items()))
+    return await get_or_load(key, load)
+
+
 # Create a new course
 @router.post("/", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_course(
+    background_tasks: BackgroundTasks,
     field: str,
     subject: str | None = None,
     class_timing: str | None = None,
     instructor_name: str | None = None,
     course_pic: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_async_db)
 ):
-    # Handle file upload if provided
+    # Handle file upload if provided: streamed to storage under its content hash
     course_pic_path = None
     if course_pic:
-        # Create unique filename using timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_extension = os.path.splitext(course_pic.filename)[1]
-        filename = f"course_{field}_{timestamp}{file_extension}"
-        # Ensure upload directory exists
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        file_path = os.path.join(UPLOAD_DIR, filename)
-
-
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(course_pic.file, buffer)
-        
-        course_pic_path = str(file_path)
+        try:
+            key = await storage.save_upload(course_pic)
+        except UploadTooLarge:
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail="Course picture is too large"
+            )
+        course_pic_path = storage.location(key)
+        # Thumbnails are rendered after the response has been sent
+        background_tasks.add_task(generate_variants, key)
 
     # Create course with file path
-    return create_course(
+    return await create_course(
         db=db,
         field=field,
         subject=subject,
@@ -55,48 +95,244 @@ async def create_new_course(
         course_pic=course_pic_path
     )
 
-# Get course by ID
+# Bulk import courses from a JSON array, NDJSON (application/x-ndjson) or CSV
+# (text/csv with a header row). Valid rows are inserted in chunks; invalid rows
+# are reported by their 0-based position and do not stop the import.
+@router.post("/bulk", response_model=BulkCourseResult)
+async def bulk_import_courses(
+    request: Request,
+    db: DBSession = Depends(get_async_db)
+):
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if content_type == "application/json":
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid JSON body"
+            )
+        if not isinstance(payload, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of courses"
+            )
+        rows = iter_json_array_rows(payload)
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = iter_ndjson_rows(request.stream())
+    elif content_type == "text/csv":
+        rows = iter_csv_rows(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type {content_type}"
+        )
+
+    inserted = 0
+    errors = []
+    chunk, chunk_rows = [], []
+
+    async def flush():
+        nonlocal inserted
+        count, failures = await bulk_create_courses(db, chunk)
+        inserted += count
+        errors.extend(BulkRowError(row=chunk_rows[position], error=error) for position, error in failures)
+        chunk.clear()
+        chunk_rows.clear()
+
+    async for row_number, row, error in rows:
+        if error is None:
+            try:
+                chunk.append(CourseBase.model_validate(row).model_dump())
+                chunk_rows.append(row_number)
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        if error is not None:
+            errors.append(BulkRowError(row=row_number, error=error))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+
+    errors.sort(key=lambda e: e.row)
+    return BulkCourseResult(inserted=inserted, errors=errors)
+
+# Stream the whole catalog (optionally filtered) in id order as NDJSON or CSV,
+# for reporting jobs that would otherwise page through GET /courses/.
+# include_students adds each course's roster: a "students" list in NDJSON,
+# one line per enrollment in CSV. Declared before /{course_id}, which would
+# otherwise capture the path.
+@router.get("/export")
+async def export_catalog(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    include_students: bool = False,
+    field: Optional[str] = None,
+    instructor: Optional[str] = None,
+):
+    filters = {key: value for key, value in (("field", field), ("instructor_name", instructor)) if value is not None}
+    return StreamingResponse(
+        export_courses(format, COURSE_RESPONSE_FIELDS, include_students=include_students, **filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="courses.{format}"'}
+    )
+
+# Enroll many students in a course at once
+@router.post("/{course_id}/enrollments:batch", response_model=EnrollmentBatchResult)
+async def batch_enroll_students(
+    course_id: int,
+    batch: EnrollmentBatch,
+    db: DBSession = Depends(get_async_db)
+):
+    result = await bulk_enroll_students(db, course_id, batch.student_ids)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id {course_id} not found"
+        )
+    return result
+
+# Get course by ID (ETag from its updated_at)
 @router.get("/{course_id}", response_model=CourseResponse)
 async def get_course_by_id(
     course_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_async_db)
 ):
-    db_course = get_course(db, course_id)
+    db_course = await get_course_cached(db, course_id)
     if db_course is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Course with id {course_id} not found"
         )
+    headers = {"ETag": weak_etag(course_id, db_course["updated_at"]), "Cache-Control": COURSE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
     return db_course
 
-# Get all courses with pagination
-@router.get("/", response_model=List[CourseResponse])
+async def _course_batch(db: DBSession, course_ids: List[int]) -> CourseBatchResult:
+    course_ids = list(dict.fromkeys(course_ids))
+    if len(course_ids) > COURSE_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {COURSE_BATCH_MAX_IDS} ids per batch"
+        )
+    courses = await get_courses_cached(db, course_ids)
+    return CourseBatchResult(
+        items=[courses[course_id] for course_id in course_ids if course_id in courses],
+        missing_ids=[course_id for course_id in course_ids if course_id not in courses]
+    )
+
+# Get many courses by ID at once (e.g. a student's schedule), in the order
+# given, from the course cache and one query for the rest. Unknown ids are
+# listed in missing_ids. POST takes {"ids": [...]} for sets too long for a URL.
+@router.get(":batch", response_model=CourseBatchResult)
+async def get_courses_batch(
+    ids: str,
+    db: DBSession = Depends(get_async_db)
+):
+    try:
+        course_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of course ids"
+        )
+    return await _course_batch(db, course_ids)
+
+@router.post(":batch", response_model=CourseBatchResult)
+async def post_courses_batch(
+    batch: CourseBatch,
+    db: DBSession = Depends(get_async_db)
+):
+    return await _course_batch(db, batch.ids)
+
+# Get all courses with pagination.
+# Passing `cursor` (empty for the first page) switches to keyset pagination and
+# returns a CoursePage whose next_cursor fetches the following page.
+# `field` and `instructor` filter exactly; `q` searches the subject text and
+# orders results by relevance, so it cannot be combined with an id cursor.
+# The ETag derives from the catalog version and the query string; a matching
+# If-None-Match gets a 304 before any page is loaded or serialized.
+@router.get("/", response_model=Union[List[CourseResponse], CoursePage])
 async def get_courses(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    field: Optional[str] = None,
+    instructor: Optional[str] = None,
+    q: Optional[str] = None,
+    db: DBSession = Depends(get_async_db)
 ):
-    return get_all_courses(db, skip=skip, limit=limit)
+    if q and cursor is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search results are ordered by relevance; use skip/limit instead of cursor"
+        )
+    filters = {key: value for key, value in (("field", field), ("instructor_name", instructor), ("search", q or None))
+               if value is not None}
 
-# Get course image by name
-@router.get("/images/{image_name}")
-async def get_image(image_name: str):
-    file_path = f"uploads/{image_name}"
-    return FileResponse(
-        file_path,
-        media_type="image/jpeg", 
-        filename=image_name
+    version = await get_catalog_version(db)
+    headers = {"ETag": weak_etag(version, request.url.query), "Cache-Control": COURSE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if include_total:
+        headers["X-Total-Count"] = str(await count_courses_cached(db, version=version, **filters))
+
+    if COURSE_LIST_FAST_PATH:
+        after_id = decode_cursor(cursor) if cursor is not None else None
+        body = await _course_listing_json(db, skip, limit, after_id, keyset=cursor is not None,
+                                         version=version, **filters)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    response.headers.update(headers)
+    if cursor is None:
+        return await get_all_courses_cached(db, skip=skip, limit=limit, version=version, **filters)
+
+    courses = await get_courses_after_cached(db, after_id=decode_cursor(cursor), limit=limit, version=version,
+                                             **filters)
+    next_cursor = encode_cursor(courses[-1]["id"]) if courses and len(courses) == limit else None
+    return CoursePage(
+        items=[CourseResponse.model_validate(course) for course in courses],
+        next_cursor=next_cursor
     )
 
+# Roster of a course, one page per query
+@router.get("/{course_id}/students", response_model=List[StudentSummary])
+async def get_students_in_course(
+    course_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: DBSession = Depends(get_async_db)
+):
+    if await get_course_cached(db, course_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id {course_id} not found"
+        )
+    return await get_course_students(db, course_id, skip=skip, limit=limit)
+
+# Get course image by name (uploads first, then the bundled assets) with
+# ETag/Last-Modified validation and byte ranges. `w` selects the smallest
+# resized variant at least that wide, falling back to the original.
+@router.get("/images/{image_name}")
+async def get_image(image_name: str, request: Request, w: Optional[int] = None):
+    return await image_response(request, await pick_variant(image_name, w))
+
 
 # Update course by ID
 @router.put("/{course_id}", response_model=CourseResponse)
 async def update_course_by_id(
     course_id: int,
     course: CourseUpdate,
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_async_db)
 ):
-    db_course = update_course(db, course_id, **course.model_dump(exclude_unset=True))
+    db_course = await update_course(db, course_id, **course.model_dump(exclude_unset=True))
     if db_course is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -108,12 +344,42 @@ async def update_course_by_id(
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_course_by_id(
     course_id: int,
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_async_db)
 ):
-    success = delete_course(db, course_id)
+    success = await delete_course(db, course_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Course with id {course_id} not found"
         )
+    return None
+
+# Enroll the current student in a course (idempotent)
+@router.post("/{course_id}/enroll", status_code=status.HTTP_200_OK)
+async def enroll_in_course(
+    course_id: int,
+    user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_async_db)
+):
+    enrolled = await enroll_student_in_course(db, user.id, course_id)
+    if enrolled is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id {course_id} not found"
+        )
+    return {"message": "Enrolled successfully" if enrolled else "Already enrolled"}
+
+# Unenroll the current student from a course
+@router.delete("/{course_id}/enroll", status_code=status.HTTP_204_NO_CONTENT)
+async def unenroll_from_course(
+    course_id: int,
+    user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_async_db)
+):
+    success = await unenroll_student_from_course(db, user.id, course_id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Not enrolled in course {course_id}"
+        )
     return None
\ No newline at end of file
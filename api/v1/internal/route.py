@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Optional
+import os
+import secrets
+from db.init_db import get_async_engine, get_engine
+from db.pool_metrics import pool_snapshot
+from db.course_cache import course_cache
+from utils.principal_cache import principal_cache
+from utils.jwt_utils import verified_tokens
+
+# Pool and cache internals are only mounted when enabled (see create_app); with
+# INTERNAL_API_TOKEN set, requests must also send it as X-Internal-Token
+INTERNAL_ENDPOINTS_ENABLED = os.getenv("INTERNAL_ENDPOINTS_ENABLED", "false").lower() in ("1", "true", "yes")
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    if INTERNAL_API_TOKEN and not (
+        x_internal_token and secrets.compare_digest(x_internal_token.encode(), INTERNAL_API_TOKEN.encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid internal token"
+        )
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(require_internal_token)],
+    include_in_schema=False
+)
+
+# Connection pool occupancy and checkout wait times
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    stats = {"sync": pool_snapshot(get_engine().pool)}
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        stats["async"] = pool_snapshot(async_engine.pool)
+    return stats
+
+# Cache hit/miss/eviction counters
+@router.get("/cache")
+async def get_cache_stats():
+    return {
+        "courses": course_cache.info(),
+        "principals": principal_cache.info(),
+        "verified_tokens": verified_tokens.info(),
+    }
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from typing import List
+from db.session import DBSession, get_async_db
+from db.async_CRUD import get_student_courses
+from schemas.auth import UserResponse
+from schemas.course import CourseResponse
+from utils.jwt_utils import get_current_user
+
+router = APIRouter(
+    prefix="/students",
+    tags=["students"]
+)
+
+# Courses the current student is enrolled in, one page per query
+@router.get("/me/courses", response_model=List[CourseResponse])
+async def get_my_courses(
+    skip: int = 0,
+    limit: int = 100,
+    user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_async_db)
+):
+    return await get_student_courses(db, user.id, skip=skip, limit=limit)